@@ -0,0 +1,55 @@
+"""
+Per-call cost of FlightConditions with the analytic standard atmosphere and with the interpolated AtmosphereTable,
+and the table's error against the analytic model
+
+    python benchmarks/atmosphere_table.py
+"""
+import timeit
+import numpy as np
+
+from WUADS.flight_conditions import (FlightConditions, FlightConditionsArray, standard_atmosphere,
+                                     use_atmosphere_table, atmosphere_table)
+
+N = 20000
+altitudes = [0, 10000, 35000]
+
+
+def per_call(function, number=N):
+    return timeit.timeit(function, number=number) / number * 1e6
+
+
+def run():
+    # FlightConditions are interned, _create times the calculation rather than the cache lookup
+    use_atmosphere_table(False)
+    analytic = {h: per_call(lambda: FlightConditions._create(h, .78)) for h in altitudes}
+    envelope = np.linspace(0, 45000, 10000)
+    analytic_array = per_call(lambda: FlightConditionsArray(envelope, .78), number=200)
+
+    use_atmosphere_table()
+    table = {h: per_call(lambda: FlightConditions._create(h, .78)) for h in altitudes}
+    interned = per_call(lambda: FlightConditions(35000, .78))
+    table_array = per_call(lambda: FlightConditionsArray(envelope, .78), number=200)
+
+    print('FlightConditions per call (us)')
+    print(f'{"altitude (ft)":>15}{"analytic":>12}{"table":>12}{"speedup":>10}')
+    for h in altitudes:
+        print(f'{h:>15}{analytic[h]:>12.2f}{table[h]:>12.2f}{analytic[h] / table[h]:>10.1f}')
+    print(f'{"10000 altitudes":>15}{analytic_array:>12.1f}{table_array:>12.1f}{analytic_array / table_array:>10.1f}'
+          '  (arrays always use the analytic model)')
+    print(f'Repeated (interned) FlightConditions: {interned:.2f} us')
+
+    # Error of the table against the analytic model
+    h = np.random.default_rng(0).uniform(0, 100000, 1000000)
+    exact = np.column_stack(standard_atmosphere(h))
+    interpolated = np.column_stack(atmosphere_table()(h))
+    error = np.abs(interpolated / exact - 1).max(axis=0)
+
+    print('\nRelative error of the table')
+    print(f'{"property":>15}{"measured":>12}{"bound":>12}')
+    for name, e in zip(atmosphere_table().properties, error):
+        print(f'{name:>15}{e:>12.2e}{atmosphere_table().error_bound[name]:>12.2e}')
+    use_atmosphere_table(False)
+
+
+if __name__ == '__main__':
+    run()
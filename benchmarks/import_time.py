@@ -0,0 +1,67 @@
+"""
+Import time of the WUADS package, and a check that heavy optional dependencies aren't imported with it
+
+Each import runs in a fresh interpreter. Exits with an error if any of the deferred modules were imported, or if the
+median import time is above --max-seconds.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --max-seconds 1
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Only needed by the functions that use them, e.g. Excel engine decks, the aero surrogate and the GUI
+DEFERRED_MODULES = ['pandas', 'openpyxl', 'scipy', 'PySide6', 'pyvista', 'pyvistaqt']
+
+_IMPORT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(m for m in {deferred} if m in sys.modules))
+"""
+
+
+def import_time(module='WUADS', repeat=5):
+    """
+    Imports a module in fresh interpreters
+
+    :param str module: module to import
+    :param int repeat: number of interpreters
+
+    :return: import times (s), and the deferred modules that were imported with it
+    """
+    times, imported = [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _IMPORT.format(module=module, deferred=DEFERRED_MODULES)],
+                                capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(output[0]))
+        imported.update(output[1].split() if len(output) > 1 else [])
+    return times, sorted(imported)
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters to time')
+    parser.add_argument('--max-seconds', type=float, default=None, help='fail if the median import time is above this')
+    args = parser.parse_args()
+
+    failed = False
+    for module in ['WUADS', 'WUADS.gui.main']:
+        times, imported = import_time(module, args.repeat)
+        median = statistics.median(times)
+        print(f'import {module}: median {median * 1e3:.0f} ms, min {min(times) * 1e3:.0f} ms')
+        if imported:
+            print(f'  imported deferred modules: {", ".join(imported)}')
+            failed = True
+        if args.max_seconds is not None and median > args.max_seconds:
+            print(f'  slower than {args.max_seconds} s')
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,41 @@
+"""
+Cost of making aircraft variants on the 737-800 sample: constructing from the config file, Aircraft.clone, and an
+Aircraft.snapshot / restore round trip around a what-if edit
+
+    python benchmarks/snapshot.py
+"""
+import logging
+import os
+import timeit
+
+from WUADS import Aircraft
+
+N = 50
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'src', 'WUADS', 'assets', '737-800.yml')
+
+
+def run():
+    logging.disable(logging.WARNING)
+    ac = Aircraft(CONFIG)
+    snapshot = ac.snapshot()
+
+    def what_if():
+        ac.update_component(('Main Wing', 'span', 120))
+        ac.weight_takeoff
+        ac.restore(snapshot)
+
+    build = timeit.timeit(lambda: Aircraft(CONFIG), number=10) / 10 * 1e3
+    clone = timeit.timeit(ac.clone, number=N) / N * 1e3
+    snap = timeit.timeit(ac.snapshot, number=N) / N * 1e3
+    restore = timeit.timeit(lambda: ac.restore(snapshot), number=N) / N * 1e3
+    edit = timeit.timeit(what_if, number=N) / N * 1e3
+
+    print(f'{"":>28}{"ms":>8}{"speedup":>10}')
+    print(f'{"Aircraft(config_file)":>28}{build:>8.2f}')
+    for name, t in [('clone', clone), ('snapshot', snap), ('restore', restore)]:
+        print(f'{name:>28}{t:>8.2f}{build / t:>10.1f}')
+    print(f'{"edit, resize and restore":>28}{edit:>8.2f}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,153 @@
+"""
+Per-call cost of the vectorized wing parasite and wave drag against the original strip by strip loops, on the 737-800
+sample, and the largest difference between them. Also times a drag rise curve from Aircraft.drag_rise against calling
+get_cd0 at each Mach number.
+
+    python benchmarks/wing_drag.py
+"""
+import logging
+import os
+import timeit
+import numpy as np
+
+from WUADS import Aircraft
+from WUADS.components.aerobodies.wing import Wing
+from WUADS.components.component import PhysicalComponent
+from WUADS.flight_conditions import FlightConditions
+
+N = 500
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'src', 'WUADS', 'assets', '737-800.yml')
+
+
+def loop_parasite_drag(wing, flight_conditions, sref):
+    """ Wing.parasite_drag as it was before it was vectorized, evaluating one strip at a time """
+    xc = wing.xc
+    mach = flight_conditions.mach
+    n_strips = 40
+    cd0 = 0
+
+    tc_list = list(wing.airfoil_thickness)
+    if not tc_list:
+        tc_list = [wing.tc]
+    while len(tc_list) < len(wing.avl_sections):
+        tc_list.append(tc_list[-1])
+
+    for i in range(len(wing.avl_sections) - 1):
+        span = wing.avl_sections[i + 1][1] - wing.avl_sections[i][1]
+        if span == 0:
+            span = wing.avl_sections[i + 1][2] - wing.avl_sections[i][2]
+
+        n_strips_section = round(n_strips * (span / wing.span))
+        dy = span / n_strips_section
+        chords = np.linspace(wing.avl_sections[i][3], wing.avl_sections[i + 1][3], n_strips_section + 1)
+        dx = wing.avl_sections[i + 1][0] - wing.avl_sections[i][0]
+        sweep = np.arctan(dx / span)
+        tc = np.linspace(tc_list[i], tc_list[i + 1], n_strips_section)
+
+        for j in range(n_strips_section):
+            form_factor = ((1 + tc[j] * .6 / xc + 100 * tc[j] ** 4) * (1.34 * mach ** .18 * (np.cos(sweep)) ** .28))
+            l_char = .5 * (chords[j] + chords[j + 1])
+            area = l_char * dy * 2
+            aspect_ratio = dy ** 2 / area
+            kq = 0.95
+            t = chords[j + 1] / chords[j]
+            l_char = chords[j] * (2 / 3) * ((1 + t + t ** 2) / (1 + t))
+
+            Qw = kq * tc[j] * area * np.sqrt(area / aspect_ratio) / np.sqrt(1 + t)
+            s_wet = (2 + .5 * tc[j]) * (Qw * np.sqrt(aspect_ratio * (1 + t)) / (kq * tc[j])) ** (2 / 3)
+            cd0 += PhysicalComponent.parasite_drag(wing, form_factor, l_char, flight_conditions, sref) * \
+                s_wet / wing.s_wet
+    return cd0
+
+
+def loop_wave_drag(wing, aircraft, flight_conditions):
+    """ Wing.set_wave_drag as it was before it was vectorized, evaluating one strip at a time """
+    fc = flight_conditions
+    n_strips = 40
+    rho = fc.rho
+    v = fc.velocity
+    m = fc.mach
+    if m < .5 or aircraft.sref == 0:
+        return 0
+
+    gamma_0 = aircraft.weight_takeoff * .99 / (.25 * np.pi * v * rho * wing.span)
+    cdw = 0
+
+    tc_list = list(wing.airfoil_thickness)
+    if not tc_list:
+        tc_list = [wing.tc]
+    while len(tc_list) < len(wing.avl_sections):
+        tc_list.append(tc_list[-1])
+
+    for i in range(len(wing.avl_sections) - 1):
+        span = (wing.avl_sections[i + 1][1] - wing.avl_sections[i][1])
+        if span == 0:
+            span = wing.avl_sections[i + 1][2] - wing.avl_sections[i][2]
+
+        n_strips_section = round(n_strips * (span / (.5 * wing.span)))
+        dy = span / n_strips_section
+        chords = np.linspace(wing.avl_sections[i][3], wing.avl_sections[i + 1][3], n_strips_section + 1)
+        tc = np.linspace(tc_list[i], tc_list[i + 1], n_strips_section)
+        yle = wing.avl_sections[i][1]
+        y_dist = np.linspace(yle, yle + span, n_strips_section)
+
+        for j in range(n_strips_section):
+            c = .5 * (chords[j] + chords[j + 1])
+            area = c * dy
+            with np.errstate(invalid='ignore'):
+                gamma = gamma_0 * np.sqrt(1 - (2 * (y_dist[j] - wing.yle) / wing.span) ** 2)
+            lprime = rho * v * gamma
+            cl = lprime / (.5 * rho * v ** 2 * c)
+            cos = np.cos(wing.sweep_mid)
+            mdd = (.95 - cl / (10 * cos ** 2) - tc[j] / cos) / cos
+            mcr = mdd - .1077217
+            if m > mcr:
+                cdw += 20 * (m - mcr) ** 4 * (area / aircraft.sref) * 2
+    return cdw
+
+
+def run():
+    logging.disable(logging.WARNING)
+    ac = Aircraft(CONFIG)
+    wings = [comp for comp in ac.aero_components.values() if isinstance(comp, Wing)]
+    conditions = [FlightConditions(h, m) for h in (0, 20000, 35000) for m in (.3, .6, .78, .85)]
+
+    error = 0
+    wave_error = 0
+    for wing in wings:
+        for fc in conditions:
+            reference = loop_parasite_drag(wing, fc, ac.sref)
+            wing.parasite_drag(fc, ac.sref, ac)
+            error = max(error, abs(wing.cd0 / reference - 1))
+
+            # Tails don't have wave drag
+            reference = loop_wave_drag(wing, ac, fc)
+            if reference and type(wing).set_wave_drag is Wing.set_wave_drag:
+                wave_error = max(wave_error, abs(wing.set_wave_drag(ac, fc) / reference - 1))
+
+    fc = ac.cruise_conditions
+    print('Wing parasite drag per call (us)')
+    print(f'{"component":>22}{"loop":>10}{"arrays":>10}{"speedup":>10}')
+    for wing in wings:
+        loop = timeit.timeit(lambda: loop_parasite_drag(wing, fc, ac.sref), number=N) / N * 1e6
+        vectorized = timeit.timeit(lambda: wing.parasite_drag(fc, ac.sref, ac), number=N) / N * 1e6
+        print(f'{wing.title:>22}{loop:>10.1f}{vectorized:>10.1f}{loop / vectorized:>10.1f}')
+    print(f'Largest relative difference from the loop: {error:.1e}')
+
+    wing = ac.aero_components['Main Wing']
+    fc = FlightConditions(ac.h_cruise, .85)
+    loop = timeit.timeit(lambda: loop_wave_drag(wing, ac, fc), number=N) / N * 1e6
+    vectorized = timeit.timeit(lambda: wing.set_wave_drag(ac, fc), number=N) / N * 1e6
+    print(f'\nMain wing wave drag per call (us) at mach .85: loop {loop:.1f}, arrays {vectorized:.1f}, '
+          f'speedup {loop / vectorized:.1f}')
+    print(f'Largest relative difference from the loop: {wave_error:.1e}')
+
+    machs = np.linspace(.6, .9, 61)
+    curve = timeit.timeit(lambda: ac.drag_rise(machs), number=20) / 20 * 1e3
+    per_mach = timeit.timeit(lambda: [ac.get_cd0(ac.h_cruise, m) for m in machs], number=20) / 20 * 1e3
+    print(f'Drag rise curve over {len(machs)} Mach numbers (ms): drag_rise {curve:.2f}, get_cd0 at each Mach '
+          f'{per_mach:.2f}')
+
+
+if __name__ == '__main__':
+    run()
@@ -2,17 +2,35 @@ __version__ = "0.1.0"
 
 # Expose core functionality at the package level
 from .aircraft import Aircraft
-from .mission import Mission
+from .mission import Mission, PayloadRange
 from .propulsion import turbofan, propeller
 from .reports import weights_report, mission_profile_report
+from .avl_run import AVLSession, AVLError
+from .avl_cache import AVLCache
+from .drag_cache import DragCache
+from .avl_output import AVLResult
+from .vlm import VortexLattice
+from .surrogate import AeroSurrogate
+from .drag_polar import DragPolar
+from .result_store import ResultStore
 
 # Clean up namespace
 __all__ = [
     "Aircraft",
     "Mission",
+    "PayloadRange",
     "turbofan",
     "propeller",
     "weights_report",
     "mission_profile_report",
+    "AVLSession",
+    "AVLError",
+    "AVLCache",
+    "DragCache",
+    "AVLResult",
+    "VortexLattice",
+    "AeroSurrogate",
+    "DragPolar",
+    "ResultStore",
     "__version__"
 ]
\ No newline at end of file
@@ -1,4 +1,8 @@
+import copy
+import functools
 import importlib
+import importlib.util
+import itertools
 import sys
 # from ruamel.yaml import YAML
 import yaml
@@ -8,8 +12,13 @@ from .components.subsystems import Subsystems
 from .mission import Mission
 from .components.usefulload import UsefulLoad
 from .propulsion import turbofan, propeller, turboprop
+from .avl_cache import AVLCache
+from .drag_cache import DragCache
+from .dependencies import DependencyGraph
+from .weight_solvers import WEIGHT_SOLVERS
+from .vlm import VortexLattice
 from .mission_segments import *
-from .flight_conditions import FlightConditions
+from .flight_conditions import FlightConditions, FlightConditionsArray
 from .components.aerobodies.wing import Wing
 from .components.aerobodies.fuselage import Fuselage
 from .components.aerobodies.horizontal import Horizontal
@@ -28,6 +37,13 @@ AEROBODY_CLASSES = {
     "wing_yehudi": Wing_Yehudi
 }
 
+# Aircraft attributes which snapshots and clones share rather than copy, see Aircraft.snapshot
+SHARED_ATTRIBUTES = ['avl_session', 'avl_cache', 'drag_cache', 'aero_surrogate', 'drag_polar']
+
+# Geometry versions are never reused within a process, so results cached against one stay valid when an aircraft is
+# restored to an earlier snapshot or cloned
+_geometry_versions = itertools.count(1)
+
 import logging
 
 # Set up basic config: terminal output only
@@ -37,6 +53,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _module_path(identifier):
+    """ Absolute path of a user module given as a .py file, None if it's given as a module name """
+    if identifier.endswith('.py') or os.path.sep in identifier or os.path.exists(identifier):
+        return os.path.abspath(identifier)
+    return None
+
+
+def load_user_module(identifier):
+    """
+    Loads a user-specified module, which can be either:
+      - a Python module name (importable via sys.path)
+      - or a direct path to a .py file, registered in sys.modules under the file name
+    A file which was already loaded isn't executed again, so its classes stay the ones existing components were made
+    from and those components can still be pickled.
+    Returns: the loaded module object
+    """
+    path = _module_path(identifier)
+
+    # Case 1: user passed a path to a .py file
+    if path is not None:
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        module = sys.modules.get(module_name)
+        if module is not None and getattr(module, '__file__', None) == path:
+            return module
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        return module
+
+    # Case 2: user passed a normal importable module name
+    else:
+        return importlib.import_module(identifier)
+
+
+def _reserve_geometry_version(version):
+    """ Makes sure geometry versions handed out from now on are above version """
+    global _geometry_versions
+    _geometry_versions = itertools.count(max(next(_geometry_versions), version + 1))
+
+
+def _unpickle_aircraft(cls, user_modules):
+    """ Imports the modules of an aircraft's custom components, then creates the empty aircraft its state goes into """
+    for identifier in user_modules:
+        load_user_module(identifier)
+    return object.__new__(cls)
+
+
 class Aircraft:
     """
     Class for whole aircraft analysis
@@ -60,9 +125,15 @@ class Aircraft:
 
         # Default Values
 
+        # Weights, cg, reference area and drag are derived quantities, they're recomputed when they're next used
+        # after any of their inputs change, see _build_dependencies
+        self.dependencies = DependencyGraph()
+        self._components_changed = set()  # Components changed since the weights were last set
+        self._component_drag = {}  # Parasite and wave drag coefficients of each component at cruise
+
         self.title = ''
         self.aero_components = {}
-        self.cruise_conditions = {}  # Flight conditions at cruise
+        self._cruise_conditions = {}  # Flight conditions at cruise
         self.sref = 0  # Reference Area (ft^2)
         self.cd0 = 0  # Parasite Drag coefficient
         self.cdw = 0  # Wave drag coefficient
@@ -81,6 +152,8 @@ class Aircraft:
         self.weight_takeoff = 0  # Takeoff Gross Weight (lbs)
         self.weight_empty = 0  # Empty weight, no fuel, no cargo, no crew
         self.weight_max = 0  # Max Takeoff weight
+        self.weight_solver = 'relaxation'  # Takeoff gross weight fixed point solver, see weight_solvers.WEIGHT_SOLVERS
+        self.weight_iterations = 0  # Number of times the component weights were evaluated by the last set_weight
         self._w_ref = None  # Reference weight used to calculate component weights, typically the same as weight_max
 
         self._w_cargo = 0  # Cargo weight
@@ -93,12 +166,24 @@ class Aircraft:
         self.stability = None
         self.propulsion = None
         self.aircraft_type = 'transport'
+        self.avl_session = None  # Persistent AVL process used by run_AVL, see avl_run.AVLSession
+        self.avl_cache = AVLCache()  # Cache of AVL results, set to None to always run AVL
+        self.drag_cache = DragCache()  # Cache of get_cd0 results, set to None to always recalculate the drag
+        self.aero_backend = 'avl'  # Aerodynamic analysis used by the mission, 'avl', 'vlm', 'surrogate' or 'polar'
+        self.aero_surrogate = None  # Trained surrogate.AeroSurrogate used by the 'surrogate' aero backend
+        self.drag_polar = None  # drag_polar.DragPolar used by the 'polar' aero backend
+        # Changed whenever the aero components change, see vortex_lattice and get_cd0. Unique within the process, so
+        # results keyed on it are never mixed up between aircraft
+        self.geometry_version = next(_geometry_versions)
+        self._vortex_lattice = None
+        self._user_modules = []  # Files or names of the modules custom components come from, see __reduce__
 
         self._output_dir = None
         self._file_prefix = None
 
         self.input_file = config_file
         self.load_config()
+        self._build_dependencies()
         self.set_weight(wdg_guess=wdg_guess, reference_weight=self.reference_weight)
         self.set_cd0()
         self.file_prefix = self.title
@@ -111,27 +196,6 @@ class Aircraft:
         Reads input YAML file and initializes aircraft and declared components
         """
 
-        def load_user_module(identifier):
-            """
-            Loads a user-specified module, which can be either:
-              - a Python module name (importable via sys.path)
-              - or a direct path to a .py file
-            Returns: the loaded module object
-            """
-            # Case 1: user passed a path to a .py file
-            if identifier.endswith('.py') or os.path.sep in identifier or os.path.exists(identifier):
-                path = os.path.abspath(identifier)
-                module_name = os.path.splitext(os.path.basename(path))[0]
-                spec = importlib.util.spec_from_file_location(module_name, path)
-                module = importlib.util.module_from_spec(spec)
-                sys.modules[module_name] = module
-                spec.loader.exec_module(module)
-                return module
-
-            # Case 2: user passed a normal importable module name
-            else:
-                return importlib.import_module(identifier)
-
         self.mission = Mission(self)
         with open(self.input_file) as f:
             # yml = YAML(typ='safe', pure=True)
@@ -163,6 +227,9 @@ class Aircraft:
                 elif 'module_name' in params:
                     module = load_user_module(params['module_name'])
                     component_class = getattr(module, component_type)
+                    identifier = _module_path(params['module_name']) or params['module_name']
+                    if identifier not in self._user_modules:
+                        self._user_modules.append(identifier)
 
                 if 'title' not in params:
                     params['title'] = component_type
@@ -270,38 +337,144 @@ class Aircraft:
     def set_cd0(self):
         """
         Calculates each components parasite drag coefficient and sets the overall aircraft drag coefficient
+
+        The drag is otherwise recalculated when it's next used after a change, this recalculates every component now.
         """
         # https://arc.aiaa.org/doi/abs/10.2514/1.47557
+        self.dependencies.invalidate(*(f'{drag}:{title}' for title in self.aero_components for drag in ('cd0', 'cdw')))
+        self.dependencies.update('cd0')
+        self.dependencies.update('cdw')
 
-        cd0, cdw = self.get_cd0()
+    def _build_dependencies(self):
+        """
+        Registers the derived quantities and their inputs with the dependency graph, all of them start out stale
+
+        Inputs are each aero component ('component:<title>'), the cruise conditions, the useful load, the miscellaneous
+        components and the number of engines. The weights, cg and inertia are set together by set_weight, and depend on
+        everything. The parasite drag of a component only depends on that component, the reference area, the cruise
+        conditions and the number of engines (engine drag scales with it), while wave drag also depends on the weight.
+        """
+        graph = self.dependencies = DependencyGraph()
+        components = [f'component:{title}' for title in self.aero_components]
+        graph.add('sref', self._update_sref, ['component:Main Wing'])
+        graph.add('weight', self._update_weight,
+                  components + ['sref', 'cruise_conditions', 'useful_load', 'misc_components', 'n_engines'])
+        for title in self.aero_components:
+            graph.add(f'cd0:{title}', functools.partial(self._update_component_drag, title, 0),
+                      [f'component:{title}', 'sref', 'cruise_conditions', 'n_engines'])
+            graph.add(f'cdw:{title}', functools.partial(self._update_component_drag, title, 1),
+                      [f'component:{title}', 'sref', 'cruise_conditions', 'n_engines', 'weight'])
+        graph.add('cd0', self._update_cd0, [f'cd0:{title}' for title in self.aero_components])
+        graph.add('cdw', self._update_cdw, [f'cdw:{title}' for title in self.aero_components])
+        self._component_drag = {title: [0, 0] for title in self.aero_components}
+
+    def _update_sref(self):
+        self._sref = self.aero_components['Main Wing'].area
+
+    def _update_weight(self):
+        self.set_weight(components_changed=list(self._components_changed))
+
+    def _update_component_drag(self, title, index):
+        comp = self.aero_components[title]
+        if index == 0:
+            comp.parasite_drag(self.cruise_conditions, self.sref, self)
+            self._component_drag[title][0] = comp.cd0
+        else:
+            self._component_drag[title][1] = comp.set_wave_drag(self, flight_conditions=self.cruise_conditions)
+
+    def _update_cd0(self):
+        cd0 = 0
+        for title in self.aero_components:
+            cd0 += self._component_drag[title][0]
         # parasite drag penalty for turboprop
         if self.propulsion.engine_type == 'turboprop':
             cd0 = cd0 * 1.7
             print('drag penalty applied')
-        self.cd0 = cd0
-        self.cdw = cdw
+        self._cd0 = cd0
+
+    def _update_cdw(self):
+        cdw = 0
+        for title in self.aero_components:
+            cdw += self._component_drag[title][1]
+        self._cdw = cdw
 
     def get_cd0(self, height=None, mach=None):
+        """
+        Parasite and wave drag coefficients at a flight condition
+
+        The aircraft and its components aren't changed, see set_cd0 to set the drag at cruise. Results are cached in
+        drag_cache, which is keyed on the geometry version and number of engines, so components should be changed through
+        update_component.
+
+        :param float height: altitude (ft), defaults to the cruise altitude
+        :param float mach: mach number, defaults to the cruise mach number
+
+        :return: parasite drag coefficient and wave drag coefficient
+        """
         # https://arc.aiaa.org/doi/abs/10.2514/1.47557
 
-        if height == None:
+        if height is None:
             height = self.h_cruise
-        if mach == None:
+        if mach is None:
             mach = self.mach_cruise
 
-        cd0 = 0
-        cdw = 0
+        cd0 = cdw = None
+        weight = self.weight_takeoff
+        # Engine drag scales with the number of engines, which doesn't change the geometry version
+        cd0_key = ('cd0', self.geometry_version, self.n_engines, height, mach)
+        cdw_key = ('cdw', self.geometry_version, self.n_engines, height, mach, weight)
+        if self.drag_cache is not None:
+            cd0 = self.drag_cache.get(cd0_key)
+            cdw = self.drag_cache.get(cdw_key)
+            if cd0 is not None and cdw is not None:
+                return cd0, cdw
+
         fc = FlightConditions(height, mach)
+        parasite = 0
+        wave = 0
         for comp in self.aero_components.values():
-            comp.parasite_drag(fc, self.sref, self)
-            cd0 += comp.cd0
-            #parasite drag penalty for turboprop
-            # if self.propulsion.engine_type == 'turboprop':
-            #     cd0 += comp.cd0 * 1.8
+            # The component's own drag is restored afterwards
+            component_drag = comp.cd0, comp.cdw
+            if cd0 is None:
+                comp.parasite_drag(fc, self.sref, self)
+                parasite += comp.cd0
+                #parasite drag penalty for turboprop
+                # if self.propulsion.engine_type == 'turboprop':
+                #     cd0 += comp.cd0 * 1.8
+            if cdw is None:
+                wave += comp.set_wave_drag(self, flight_conditions=fc)
+            comp.cd0, comp.cdw = component_drag
+
+        if cd0 is None:
+            cd0 = parasite
+            if self.drag_cache is not None:
+                self.drag_cache.put(cd0_key, cd0)
+        if cdw is None:
+            cdw = wave
+            if self.drag_cache is not None:
+                self.drag_cache.put(cdw_key, cdw)
+        return cd0, cdw
 
+    def drag_rise(self, mach, height=None, weight=None):
+        """
+        Wave drag coefficient over an array of Mach numbers, a drag rise curve, in one call
 
-            cdw += comp.set_wave_drag(self, flight_conditions=fc)
-        return cd0, cdw
+        :param mach: mach numbers
+        :param height: altitude (ft), a float or an array broadcast against mach, defaults to the cruise altitude
+        :param float weight: weight carried by the lift (lbs), defaults to the takeoff gross weight. Custom components
+                             need a weight argument in set_wave_drag to use it, see the custom components tutorial
+
+        :return: wave drag coefficient at each mach number
+        """
+        if height is None:
+            height = self.h_cruise
+        fc = FlightConditionsArray(height, mach)
+        # Custom components written to the two argument set_wave_drag are only passed the weight when it's given
+        kwargs = {} if weight is None else {'weight': weight}
+        cdw = np.zeros(fc.shape)
+        for comp in self.aero_components.values():
+            cdw = cdw + comp.set_wave_drag(self, flight_conditions=fc, **kwargs)
+        return cdw
 
     def set_weight(self, wdg_guess=None, fudge_factor=1.06, reference_weight=None, components_changed=None):
         """
@@ -313,13 +486,18 @@ class Aircraft:
         reference_weight: <float> Design gross weight used to set the component weights, overrides the iterative process
         components_changed: <bool> List of components changed, only used if you're using the update_components function
         """
+        with self.dependencies.computing('weight'):
+            self._set_weight(wdg_guess, fudge_factor, reference_weight, components_changed)
+        self._components_changed.clear()
+
+    def _set_weight(self, wdg_guess, fudge_factor, reference_weight, components_changed):
         if components_changed is None:
             components_changed = []
         if not wdg_guess:
+            # Warm start from the last converged weight
             wdg_guess = self.weight_takeoff
         self.weight_takeoff = 1
         margin = .00001
-        # Start iterative loop
         max_iter = 100
 
         if self.lock_component_weights:
@@ -332,16 +510,20 @@ class Aircraft:
             reference_weight = self.reference_weight
             wdg_guess = self.reference_weight
 
+        self.weight_iterations = 0
+        last_guess = []
 
-        for i in range(max_iter):
+        def evaluate(guess):
             # Set structural component weights
+            self.weight_iterations += 1
+            last_guess[:] = [guess]
 
             self.weight_takeoff = 0
             for comp in self.aero_components.values():
                 if self.lock_component_weights and (comp.title not in components_changed):
                     self.weight_takeoff += comp.weight
                 else:
-                    self.weight_takeoff += comp.set_weight(self, wdg_guess)
+                    self.weight_takeoff += comp.set_weight(self, guess)
                     comp.set_cg()
 
             for comp in self.misc_components.values():
@@ -351,7 +533,7 @@ class Aircraft:
             if self.lock_component_weights:
                 self.weight_takeoff += self.subsystems.weight
             else:
-                self.weight_takeoff += self.subsystems.set_subsystem_weights(self, wdg_guess)
+                self.weight_takeoff += self.subsystems.set_subsystem_weights(self, guess)
 
             # Add fudge factor
             self.weight_takeoff *= fudge_factor
@@ -362,15 +544,21 @@ class Aircraft:
             self.useful_load.set_weight(self)
             self.weight_takeoff += self.useful_load.weight
             self.weight_empty += self.useful_load.w_pilots * 1.65 + self.useful_load.w_flight_attendants * 1.65
+            return self.weight_takeoff
 
-            # Check if converged
-            if (np.abs((wdg_guess - self.weight_takeoff) / self.weight_takeoff) < margin
-                    or self.lock_component_weights
-                    or reference_weight):
-                break
-
-            # adjust wdg guess
-            wdg_guess = wdg_guess + (self.weight_takeoff - wdg_guess) * .75
+        if self.lock_component_weights or reference_weight:
+            # Component weights are set from a fixed weight, no iteration
+            evaluate(wdg_guess)
+        else:
+            if self.weight_solver not in WEIGHT_SOLVERS:
+                raise ValueError(f'Unknown weight solver {self.weight_solver}, '
+                                 f'valid solvers are {list(WEIGHT_SOLVERS.keys())}')
+            wdg_guess = WEIGHT_SOLVERS[self.weight_solver](evaluate, wdg_guess, margin, max_iter)
+            if wdg_guess != last_guess[0]:
+                evaluate(wdg_guess)
+            if np.abs((wdg_guess - self.weight_takeoff) / self.weight_takeoff) >= margin:
+                logger.warning(f'Takeoff gross weight did not converge in {self.weight_iterations} iterations')
+        logger.debug(f'Weights set in {self.weight_iterations} iterations')
 
         # Set moments of inertia and cg
         self.inertia = [0, 0, 0]
@@ -391,7 +579,7 @@ class Aircraft:
 
     def update_component(self, variables, **kwargs):
         """
-        Updates component and recalculates weight and parasite drag
+        Updates component, the weight and drag are recalculated when they're next used
 
         Parameters:
             variables: List of variables to update, formatted as tuples with the following format (component, variable, value)
@@ -416,10 +604,14 @@ class Aircraft:
             if title in self.aero_components:
                 self.aero_components[title].update(variable, value, **kwargs)
 
-        # Re-initialize the weights and drag
-        self.sref = self.aero_components['Main Wing'].area
-        self.set_weight(components_changed=components_changed)
-        self.set_cd0()
+        # Mark the weights and drag depending on the changed components for recalculation
+        self.geometry_version = next(_geometry_versions)
+        self._components_changed.update(components_changed)
+        if all(f'component:{title}' in self.dependencies for title in self.aero_components):
+            self.dependencies.invalidate(*(f'component:{title}' for title in components_changed))
+        else:
+            # A component was renamed
+            self._build_dependencies()
 
     def add_component(self, component_type, params):
         """
@@ -434,8 +626,8 @@ class Aircraft:
         component_class = getattr(module, class_name)
         component = component_class(params)
         self.aero_components[component.title] = component_class(params)
-        self.set_weight()
-        self.set_cd0()
+        self.geometry_version = next(_geometry_versions)
+        self._build_dependencies()
 
     def remove_component(self, component):
         """Removes a component and updates parameters"""
@@ -444,8 +636,8 @@ class Aircraft:
         #         component = key
 
         del self.aero_components[component]
-        self.set_weight()
-        self.set_cd0()
+        self.geometry_version = next(_geometry_versions)
+        self._build_dependencies()
 
     def write_config_file(self, file_name=None):
         """ Write a .yaml file to save the aircraft's variables """
@@ -542,7 +734,203 @@ class Aircraft:
         if not cg:
             cg = self.cg
         self.misc_components[title] = Component({'title': title, 'weight': weight, 'cg': cg})
-        self.set_weight()
+        self.dependencies.invalidate('misc_components')
+
+    def snapshot(self):
+        """
+        Captures the aircraft's current state, to roll back what-if edits with restore
+
+        The components, useful load, propulsion, mission profile and the derived weights, drag and mission results are
+        all captured, so nothing is recalculated after a restore. The attributes in SHARED_ATTRIBUTES (AVL session,
+        caches, surrogate and drag polar) are shared with the aircraft rather than copied.
+
+        Usage:
+            snapshot = ac.snapshot()
+            ac.update_component(('Main Wing', 'span', 120))
+            ac.mission.run_case()
+            ac.restore(snapshot)
+
+        :return: AircraftSnapshot
+        """
+        return AircraftSnapshot(self, self._copy_state(self))
+
+    def restore(self, snapshot):
+        """
+        Puts the aircraft back to the state captured by snapshot, the same snapshot can be restored again later
+
+        :param snapshot: AircraftSnapshot of this aircraft, or of another one to turn this aircraft into a copy of it
+        """
+        state = copy.deepcopy(snapshot.state, self._shared_memo(snapshot.aircraft, snapshot.state))
+        for name in list(self.__dict__):
+            if name not in state and name not in SHARED_ATTRIBUTES:
+                delattr(self, name)
+        self.__dict__.update(state)
+
+    def clone(self):
+        """
+        Copy of the aircraft, much cheaper than reading the config file again
+
+        The copy shares the attributes in SHARED_ATTRIBUTES with this aircraft, see snapshot. copy.deepcopy of an
+        aircraft is a clone as well, only pickling leaves out the AVL session and cached results, see __getstate__.
+        """
+        aircraft = object.__new__(type(self))
+        aircraft.__dict__.update(self._copy_state(aircraft))
+        for name in SHARED_ATTRIBUTES:
+            setattr(aircraft, name, getattr(self, name))
+        return aircraft
+
+    def _copy_state(self, target):
+        """ Deep copy of the attributes that aren't shared, with references to this aircraft pointing to target """
+        state = {name: value for name, value in self.__dict__.items() if name not in SHARED_ATTRIBUTES}
+        return copy.deepcopy(state, self._shared_memo(self, state, target))
+
+    def _shared_memo(self, source, state, target=None):
+        """ deepcopy memo which maps source to target (this aircraft by default) and leaves shared objects uncopied """
+        memo = {id(source): self if target is None else target}
+        for value in [getattr(source, name, None) for name in SHARED_ATTRIBUTES] + [state.get('_vortex_lattice')]:
+            # The vortex lattice is only rebuilt for a new geometry version, so it's never changed once built
+            memo[id(value)] = value
+        return memo
+
+    def __deepcopy__(self, memo):
+        # A deep copy keeps the AVL session and warm caches, like clone, rather than going through __getstate__
+        aircraft = self.clone()
+        memo[id(self)] = aircraft
+        return aircraft
+
+    def __reduce__(self):
+        # The modules of custom components are imported before the rest of the aircraft is unpickled, so it can be
+        # sent to a worker process which hasn't loaded them
+        return _unpickle_aircraft, (type(self), self._user_modules), self.__getstate__()
+
+    def __getstate__(self):
+        """
+        State sent when the aircraft is pickled, the AVL session, vortex lattice and cached results aren't included and
+        the caches start out empty, so an unpickled aircraft has to warm them up again. copy.deepcopy doesn't use this,
+        see clone
+        """
+        state = self.__dict__.copy()
+        state['avl_session'] = None
+        state['_vortex_lattice'] = None
+        if self.drag_cache is not None:
+            state['drag_cache'] = DragCache(max_size=self.drag_cache.max_size)
+        if self.avl_cache is not None:
+            state['avl_cache'] = AVLCache(db_file=self.avl_cache.db_file, max_size=self.avl_cache.max_size)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Results cached against the geometry version, in the drag polar for instance, stay valid in another process
+        _reserve_geometry_version(self.geometry_version)
+
+    @property
+    def vortex_lattice(self):
+        """
+        Vortex lattice model of the current geometry
+
+        The panel layout and factored influence matrix are built once per geometry version and reused for every flight
+        condition, update_component, add_component and remove_component invalidate it.
+        """
+        if self._vortex_lattice is None or self._vortex_lattice[0] != self.geometry_version:
+            self._vortex_lattice = (self.geometry_version, VortexLattice(self))
+        return self._vortex_lattice[1]
+
+    @property
+    def cruise_conditions(self):
+        return self._cruise_conditions
+
+    @cruise_conditions.setter
+    def cruise_conditions(self, fc):
+        self._cruise_conditions = fc
+        self.dependencies.invalidate('cruise_conditions')
+
+    @property
+    def sref(self):
+        self.dependencies.update('sref')
+        return self._sref
+
+    @sref.setter
+    def sref(self, x):
+        self._sref = x
+
+    @property
+    def cd0(self):
+        self.dependencies.update('cd0')
+        return self._cd0
+
+    @cd0.setter
+    def cd0(self, x):
+        self._cd0 = x
+
+    @property
+    def cdw(self):
+        self.dependencies.update('cdw')
+        return self._cdw
+
+    @cdw.setter
+    def cdw(self, x):
+        self._cdw = x
+
+    @property
+    def component_drag(self):
+        """ Parasite and wave drag coefficients (cd0, cdw) of each aero component at cruise, by component title """
+        self.dependencies.update('cd0')
+        self.dependencies.update('cdw')
+        return {title: tuple(drag) for title, drag in self._component_drag.items()}
+
+    @property
+    def weight_takeoff(self):
+        self.dependencies.update('weight')
+        return self._weight_takeoff
+
+    @weight_takeoff.setter
+    def weight_takeoff(self, x):
+        self._weight_takeoff = x
+
+    @property
+    def weight_empty(self):
+        self.dependencies.update('weight')
+        return self._weight_empty
+
+    @weight_empty.setter
+    def weight_empty(self, x):
+        self._weight_empty = x
+
+    @property
+    def weight_max(self):
+        self.dependencies.update('weight')
+        return self._weight_max
+
+    @weight_max.setter
+    def weight_max(self, x):
+        self._weight_max = x
+
+    @property
+    def cg(self):
+        self.dependencies.update('weight')
+        return self._cg
+
+    @cg.setter
+    def cg(self, x):
+        self._cg = x
+
+    @property
+    def cg_empty(self):
+        self.dependencies.update('weight')
+        return self._cg_empty
+
+    @cg_empty.setter
+    def cg_empty(self, x):
+        self._cg_empty = x
+
+    @property
+    def inertia(self):
+        self.dependencies.update('weight')
+        return self._inertia
+
+    @inertia.setter
+    def inertia(self, x):
+        self._inertia = x
 
     @property
     def w_cargo(self):
@@ -557,7 +945,7 @@ class Aircraft:
         self._w_cargo = weight
         if self.weight_max > 0:
             self.useful_load.w_cargo = weight
-            self.set_weight()
+            self.dependencies.invalidate('useful_load')
 
     @property
     def w_fuel(self):
@@ -569,7 +957,7 @@ class Aircraft:
         if self.weight_max > 0:
             self.mission.w_fuel = weight
             self.useful_load.w_fuel = weight
-            self.set_weight()
+            self.dependencies.invalidate('useful_load')
 
     @property
     def n_engines(self):
@@ -585,8 +973,7 @@ class Aircraft:
         except AttributeError:
             pass
         self._n_engines = n
-        if self.weight_max > 0:
-            self.set_weight()
+        self.dependencies.invalidate('n_engines')
 
     @property
     def lock_component_weights(self):
@@ -607,7 +994,6 @@ class Aircraft:
         self._h_cruise = x
         self.mission.altitude = x
         self.cruise_conditions = FlightConditions(x, self.mach_cruise)
-        self.set_cd0()
 
     @property
     def mach_cruise(self):
@@ -618,7 +1004,6 @@ class Aircraft:
         self._m_cruise = x
         self.mission.mach = x
         self.cruise_conditions = FlightConditions(self.h_cruise, x)
-        self.set_cd0()
 
     @property
     def ultimate_load(self):
@@ -632,20 +1017,19 @@ class Aircraft:
 
     @property
     def output_dir(self):
+        # Create directory if it doesn't exist, only once it's used so building or unpickling an aircraft doesn't
+        # write anything
+        if self._output_dir and not os.path.isdir(self._output_dir):
+            try:
+                os.makedirs(self._output_dir, exist_ok=True)
+            except Exception as e:
+                raise ValueError(f"Could not create directory: {e}")
         return self._output_dir
 
     @output_dir.setter
     def output_dir(self, directory: str):
         # Convert to absolute path (handles both absolute and relative)
-        output_dire = os.path.abspath(directory.strip())
-
-        # Create directory if it doesn't exist
-        if not os.path.isdir(output_dire):
-            try:
-                os.makedirs(output_dire)
-            except Exception as e:
-                raise ValueError(f"Could not create directory: {e}")
-        self._output_dir = output_dire
+        self._output_dir = os.path.abspath(directory.strip())
 
     @property
     def file_prefix(self):
@@ -693,3 +1077,13 @@ class Aircraft:
             self._w_ref = weight
         else:
             self._w_ref = None
+
+
+class AircraftSnapshot:
+    """
+    State of an aircraft captured by Aircraft.snapshot
+    """
+
+    def __init__(self, aircraft, state):
+        self.aircraft = aircraft  # Aircraft the state was captured from, references to it are mapped on restore
+        self.state = state  # Copy of the aircraft's attributes, apart from the shared ones
@@ -0,0 +1,136 @@
+import collections
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AVLCache:
+    """
+    Cache for AVL trim results
+
+    Results are keyed on a hash of the generated .avl and .mass file contents and the run case inputs, so any change to
+    the geometry, weight, cg, or flight conditions gives a new key while repeated cases are served without running AVL.
+    Results are held in an in-memory LRU, and optionally in an SQLite database so they survive between sessions.
+
+    Usage:
+        ac.avl_cache = AVLCache(db_file=os.path.join(ac.output_dir, 'avl_cache.sqlite'))
+        ac.mission.run_case()
+        print(ac.avl_cache.stats())
+    """
+
+    def __init__(self, db_file=None, max_size=1024):
+        """
+        :param str db_file: SQLite file for the on-disk tier, results are only kept in memory if not set
+        :param int max_size: Maximum number of results kept in memory
+        """
+        self.db_file = db_file
+        self.max_size = max_size
+
+        self.hits = 0  # Results served from memory
+        self.disk_hits = 0  # Results served from the database
+        self.misses = 0  # Results which needed an AVL run
+
+        self._results = collections.OrderedDict()
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(geometry, mass, *case):
+        """
+        Returns the cache key for a run case
+
+        :param str geometry: contents of the .avl geometry file
+        :param str mass: contents of the .mass file
+        :param case: run case inputs, e.g. mach number, speed of sound, density, cd0, and angle of attack
+        """
+        h = hashlib.sha256()
+        h.update(geometry.encode())
+        h.update(b'\0')
+        h.update(mass.encode())
+        h.update(b'\0')
+        h.update(repr(case).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """ Returns the cached (cl, cd, aoa) for key, or None if the case hasn't been run """
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+
+            if self.db_file:
+                row = self._db().execute('SELECT cl, cd, aoa FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    result = tuple(row)
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """ Stores the (cl, cd, aoa) result for key """
+        result = tuple(float(x) for x in result)
+        with self._lock:
+            self._remember(key, result)
+            if self.db_file:
+                db = self._db()
+                db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, *result))
+                db.commit()
+
+    def stats(self):
+        """ Returns the hit and miss counts and the fraction of lookups which didn't need an AVL run """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0}
+
+    def clear(self, disk=False):
+        """ Clears the in-memory results, and the database as well if disk is set """
+        with self._lock:
+            self._results.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if disk and self.db_file:
+                db = self._db()
+                db.execute('DELETE FROM results')
+                db.commit()
+
+    def close(self):
+        """ Closes the database connection """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _remember(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def _db(self):
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self.db_file))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS results '
+                                     '(key TEXT PRIMARY KEY, cl REAL, cd REAL, aoa REAL)')
+        return self._connection
@@ -0,0 +1,101 @@
+import re
+
+# "name = value" pairs as they're printed by AVL, e.g. "CLtot =   0.50321" or "Cl'tot =  -0.00000"
+_VALUE = re.compile(r"([A-Za-z][\w'/]*)\s*=\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![\w.])")
+# Control derivative column headers, e.g. "Elevator     d01"
+_CONTROL = re.compile(r"^\s*([A-Za-z]\w*)\s+(d\d+)\s*$", re.MULTILINE)
+
+
+class AVLResult:
+    """
+    Results of an AVL run case, parsed from the output of AVL's st command
+
+    The output is tokenized on its "name = value" pairs rather than read from fixed lines, so it doesn't depend on
+    AVL's exact layout. Every value is kept in self.values under AVL's own name (e.g. 'CLtot', 'Cma', 'CLd01'), and
+    the commonly used ones are also available as attributes. Where a name is printed more than once the first value is
+    kept, which is the stability derivative for names like Cnb that are repeated in the spiral stability line.
+
+    Usage:
+        result = AVLResult.from_file('derivs')
+        print(result.cl, result.cd, result.alpha, result.static_margin)
+    """
+
+    def __init__(self, values, controls=None):
+        """
+        :param dict values: AVL output values by name
+        :param dict controls: control derivative suffix by control surface name, e.g. {'Elevator': 'd01'}
+        """
+        self.values = values
+        self.controls = controls or {}
+
+        # Totals
+        self.alpha = values.get('Alpha')  # Angle of attack (deg)
+        self.beta = values.get('Beta')  # Sideslip angle (deg)
+        self.mach = values.get('Mach')
+        self.cl = values.get('CLtot')  # Lift coefficient
+        self.cd = values.get('CDtot')  # Drag coefficient, including the cd0 given to AVL
+        self.cdv = values.get('CDvis')  # Viscous (profile) drag coefficient
+        self.cdi = values.get('CDind')  # Induced drag coefficient
+        self.cm = values.get('Cmtot')  # Pitching moment coefficient
+        self.e = values.get('e')  # Span efficiency
+        self.elevator = values.get('Elevator')  # Trimmed elevator deflection (deg)
+
+        # Reference values
+        self.sref = values.get('Sref')
+        self.cref = values.get('Cref')
+        self.bref = values.get('Bref')
+        self.xref = values.get('Xref')
+
+        # Stability derivatives, per radian
+        self.cla = values.get('CLa')  # Lift curve slope
+        self.cma = values.get('Cma')  # Pitching moment slope
+        self.cnb = values.get('Cnb')  # Yaw moment due to sideslip
+        self.clb = values.get('Clb')  # Roll moment due to sideslip
+        self.cyb = values.get('CYb')  # Side force due to sideslip
+        self.clq = values.get('CLq')
+        self.cmq = values.get('Cmq')  # Pitch damping
+
+        # Elevator derivatives, per degree
+        elevator = self.controls.get('Elevator', 'd01')
+        self.cl_de = values.get(f'CL{elevator}')
+        self.cm_de = values.get(f'Cm{elevator}')
+
+        self.xnp = values.get('Xnp')  # Neutral point (ft)
+
+    @property
+    def static_margin(self):
+        """ Static margin as a fraction of the reference chord, positive when the neutral point is aft of the cg """
+        if self.xnp is None or self.xref is None or not self.cref:
+            return None
+        return (self.xnp - self.xref) / self.cref
+
+    @classmethod
+    def from_string(cls, text):
+        """
+        Parses AVL output
+
+        :param text: output of AVL's st command, either a string or a readable buffer
+        """
+        if hasattr(text, 'read'):
+            text = text.read()
+        if isinstance(text, bytes):
+            text = text.decode()
+
+        values = {}
+        for name, value in _VALUE.findall(text):
+            values.setdefault(name, float(value))
+        controls = {name: suffix for name, suffix in _CONTROL.findall(text)}
+        return cls(values, controls)
+
+    @classmethod
+    def from_file(cls, file_name):
+        """ Reads and parses an AVL st file """
+        with open(file_name, 'r') as fid:
+            return cls.from_string(fid.read())
+
+    def coefficients(self):
+        """ Returns the lift coefficient, drag coefficient and angle of attack (deg) """
+        return self.cl, self.cd, self.alpha
+
+    def __repr__(self):
+        return f'AVLResult(cl={self.cl}, cd={self.cd}, alpha={self.alpha})'
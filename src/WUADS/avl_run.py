@@ -1,21 +1,65 @@
+import collections
+import hashlib
+import io
 import os
+import shutil
 import subprocess
-import sys
 import logging
+import tempfile
+import threading
+import time
+import uuid
+
+from .avl_output import AVLResult
+from .vlm import vlm_coefficients
 
 logger = logging.getLogger(__name__)
+
+AVL_EXECUTABLE = 'avl'  # avl executable, either on the path or in the working directory
+AVL_TIMEOUT = 60  # Seconds allowed per AVL case before the process is killed
+AVL_RETRIES = 2  # Number of times a failed case is retried
+AVL_ALPHA_GUESSES = (4., -2., 8.)  # Starting angles of attack (deg) for the trim on each retry
+
+
+class AVLError(RuntimeError):
+    """
+    Raised when AVL fails to produce results for a case
+
+    stdout and stderr hold AVL's output from the failed run. When raised from a batch of cases, results holds the
+    AVLResult of each case with None for the ones that failed.
+    """
+
+    def __init__(self, message, stdout='', stderr='', results=None):
+        super().__init__(message)
+        self.stdout = stdout
+        self.stderr = stderr
+        self.results = results
+
 # Writes .avl file readable by avl
 # Writes avl geometry file
-def AVL_input(ac, w, mach=None):
-    if mach == None:
-        mach = ac.cruise_conditions.mach
-
-    output_dir = ac.output_dir
+def AVL_input(ac, w, mach=None, directory=None):
+    output_dir = directory or ac.output_dir
     plane_file = os.path.join(output_dir, f'{ac.file_prefix}_plane.avl')
     mass_file = os.path.join(output_dir, f'{ac.file_prefix}_mass.mass')
 
+    with open(plane_file, 'w') as fid:
+        fid.write(avl_geometry(ac, mach))
+    with open(mass_file, 'w') as fid:
+        fid.write(avl_mass(ac, w))
+
+
+def avl_geometry(ac, mach=None):
+    """
+    Returns the contents of the .avl geometry file for the aircraft
+
+    :param object ac: aircraft to write the geometry for
+    :param float mach: mach number written to the file header, defaults to the cruise mach number
+    """
+    if mach == None:
+        mach = ac.cruise_conditions.mach
+
     # Writes a .avl file that's readable by the program
-    fid = open(plane_file, 'w')
+    fid = io.StringIO()
 
     fid.write('AVL Geometry\n\n')
     fid.write('#Mach\n')
@@ -74,51 +118,355 @@ def AVL_input(ac, w, mach=None):
 
             fid.write('#--------------------------------------------------\n')
 
-    fid.close()
+    return fid.getvalue()
 
-    # Write Mass File
-    fid = open(mass_file, 'w')
+
+def avl_mass(ac, w):
+    """
+    Returns the contents of the .mass file for the aircraft at weight w (lbs)
+    """
+    fid = io.StringIO()
     fid.write('Lunit = 3.048000e-01 m\n')
     fid.write('Munit = 4.535000e-01 kg\n')
     fid.write('Tunit = 1 s\n\n')
     fid.write('{0}  {1}  {2}  {3}  {4}  {5}  {6}\n'.format(w, ac.cg[0], ac.cg[1], ac.cg[2], ac.inertia[0], ac.inertia[1], ac.inertia[2]))
-    fid.close()
+    return fid.getvalue()
+
+
+def get_coefficients(ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+    """
+    Returns the aircraft's lift coefficient, drag coefficient and angle of attack at weight w and flight conditions fc
+
+    The method is chosen by ac.aero_backend, see AERO_BACKENDS. 'avl' runs AVL, 'vlm' uses the built-in vortex
+    lattice solver in vlm.py, which doesn't need the AVL executable, 'surrogate' uses the model trained on AVL
+    results in ac.aero_surrogate, and 'polar' interpolates the drag polar in ac.drag_polar, which is fit to runs of
+    another backend. Parameters are the same as avl_coefficients.
+    """
+    backend = getattr(ac, 'aero_backend', 'avl')
+    if backend not in AERO_BACKENDS:
+        raise ValueError(f'Unknown aerodynamic backend "{backend}", options are: {", ".join(AERO_BACKENDS)}')
+    return AERO_BACKENDS[backend](ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+
+
+def avl_coefficients(ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+    """
+    Runs AVL for the aircraft at weight w and flight conditions fc and returns the resulting coefficients
+
+    Results are looked up in ac.avl_cache first, keyed on the generated geometry and mass files and the run case
+    inputs, so AVL is only run for cases it hasn't seen before.
+
+    Each AVL run works in its own scratch directory which is removed afterwards, so any number of analyses can run at
+    once from threads or processes. The last geometry and mass files are still copied to the aircraft's output
+    directory for reference.
+
+    :param object ac: aircraft to analyze
+    :param object fc: flight conditions for the run case
+    :param float w: aircraft weight (lbs)
+    :param float mach: mach number written to the geometry file, defaults to the cruise mach number
+    :param float cd0: parasite drag coefficient, defaults to the aircraft's
+    :param float cdw: wave drag coefficient, defaults to the aircraft's
+    :param float aoa: angle of attack (deg), if not set AVL trims the aircraft to level flight at weight w
+
+    :return: lift coefficient, drag coefficient, and angle of attack (deg)
+    """
+    return avl_coefficients_batch(ac, [{'fc': fc, 'w': w, 'mach': mach, 'cd0': cd0, 'cdw': cdw, 'aoa': aoa}])[0]
+
+
+def get_coefficients_batch(ac, cases):
+    """
+    Returns the coefficients for several run cases at once
+
+    With the AVL backend every case that isn't already cached is run in a single avl process, other backends analyze
+    the cases one at a time.
+
+    :param list cases: run cases, each a dict of get_coefficients keyword arguments, e.g. {'fc': fc, 'w': w, 'aoa': 2}
+
+    :return: list of (cl, cd, aoa) for each case
+    """
+    if getattr(ac, 'aero_backend', 'avl') == 'avl':
+        return avl_coefficients_batch(ac, cases)
+    return [get_coefficients(ac, **case) for case in cases]
+
+
+def avl_coefficients_batch(ac, cases):
+    """
+    Cached version of run_AVL_cases, see avl_coefficients
+
+    If any case fails the AVLError is passed on, its results hold the (cl, cd, aoa) of each case or None if it failed.
+
+    :param list cases: run cases, each a dict of avl_coefficients keyword arguments
+
+    :return: list of (cl, cd, aoa) for each case
+    """
+    cache = getattr(ac, 'avl_cache', None)
+    results = [None] * len(cases)
+    keys = [None] * len(cases)
+    pending = {}  # Cases that need to be run, repeated cases within the batch are only run once
+
+    for i, case in enumerate(cases):
+        case = _fill_case(ac, case)
+        if cache is not None:
+            keys[i] = cache.key(case['geometry'], case['mass'], case['fc'].mach, case['fc'].a, case['fc'].rho,
+                                case['cd0'] + case['cdw'], case['aoa'])
+            results[i] = cache.get(keys[i])
+            if results[i] is not None:
+                continue
+        pending.setdefault(keys[i] if cache is not None else i, (case, []))[1].append(i)
+
+    if pending:
+        with tempfile.TemporaryDirectory(prefix='wuads_avl_') as scratch_dir:
+            runs = list(pending.values())
+            error = None
+            try:
+                run_results = run_AVL_cases(ac, [run[0] for run in runs], directory=scratch_dir)
+            except AVLError as e:
+                # Keep the cases that did run before passing the failure on
+                if e.results is None:
+                    raise
+                run_results = e.results
+                error = e
+
+            for (case, indices), result in zip(runs, run_results):
+                if result is None:
+                    continue
+                result = result.coefficients()
+                for i in indices:
+                    results[i] = result
+                if cache is not None:
+                    cache.put(keys[indices[0]], result)
+
+            for file_name in (f'{ac.file_prefix}_plane.avl', f'{ac.file_prefix}_mass.mass'):
+                _copy_atomic(os.path.join(scratch_dir, file_name), os.path.join(ac.output_dir, file_name))
+
+        if error is not None:
+            error.results = results
+            raise error
+
+    return results
+
+
+def run_AVL_cases(ac, cases, directory=None, hide_output=True, session=None, timeout=None, retries=None):
+    """
+    Runs several cases in a single AVL process and returns their results
+
+    One command stream is generated for all of the cases, the geometry and mass files are only reloaded when they
+    change between cases, and each case writes its own stability derivative file which are all read back once AVL
+    has finished. If a session is passed (or attached to the aircraft as ac.avl_session) the cases are run on it
+    instead.
+
+    AVL is killed if it doesn't finish in time, which is usually AVL waiting on input after failing to trim. Cases
+    that didn't produce results are then retried one at a time in their own process, starting the trim from a
+    different angle of attack on each attempt. If a case still fails an AVLError is raised, carrying AVL's output and
+    the results of the cases which did succeed.
+
+    The files are written to directory, which defaults to the aircraft's output directory. The last case's geometry
+    and mass are left in the usual {file_prefix}_plane.avl and {file_prefix}_mass.mass files.
+
+    :param list cases: run cases, each a dict of avl_coefficients keyword arguments
+    :param str directory: working directory for the input and output files
+    :param float timeout: seconds allowed per case, defaults to AVL_TIMEOUT
+    :param int retries: number of times a failed case is retried, defaults to AVL_RETRIES
+
+    :return: list of AVLResult for each case
+    """
+    if timeout is None:
+        timeout = AVL_TIMEOUT
+    if retries is None:
+        retries = AVL_RETRIES
+
+    output_dir = directory or ac.output_dir
+    cases = [_fill_case(ac, case) for case in cases]
+    if not cases:
+        return []
+
+    # Write each distinct geometry and mass file once, the last case's go in the usual files
+    geom_files = {cases[-1]['geometry']: os.path.join(output_dir, f'{ac.file_prefix}_plane.avl')}
+    mass_files = {cases[-1]['mass']: os.path.join(output_dir, f'{ac.file_prefix}_mass.mass')}
+    for case in cases:
+        geom_files.setdefault(case['geometry'],
+                              os.path.join(output_dir, f'{ac.file_prefix}_plane_{len(geom_files)}.avl'))
+        mass_files.setdefault(case['mass'], os.path.join(output_dir, f'{ac.file_prefix}_mass_{len(mass_files)}.mass'))
+    for files in (geom_files, mass_files):
+        for contents, file_name in files.items():
+            with open(file_name, 'w') as fid:
+                fid.write(contents)
+
+    derivs_files = [os.path.join(output_dir, f'derivs_{i}') for i in range(len(cases))]
+    for derivs_file in derivs_files:
+        if os.path.exists(derivs_file):
+            os.remove(derivs_file)
+
+    if session is None:
+        session = getattr(ac, 'avl_session', None)
+    remaining = list(range(len(cases)))
+    if session is not None:
+        while remaining:
+            case = cases[remaining[0]]
+            if not session.run(geom_files[case['geometry']], mass_files[case['mass']], case['fc'],
+                               case['cd0'] + case['cdw'], derivs_files[remaining[0]], aoa=case['aoa']):
+                logger.warning('AVL session failed, falling back to a one-shot AVL run')
+                break
+            remaining.pop(0)
+
+    def case_commands(indices, alpha_guess=None):
+        commands = ''
+        geometry = mass = None
+        for i in indices:
+            case = cases[i]
+            if case['geometry'] != geometry:
+                commands += f"LOAD {geom_files[case['geometry']]}\n"
+                geometry = case['geometry']
+                mass = None
+            if case['mass'] != mass:
+                commands += f"Mass {mass_files[case['mass']]}\nMSET\n0\n"
+                mass = case['mass']
+            commands += _oper_commands(case['fc'], case['cd0'] + case['cdw'], derivs_files[i], aoa=case['aoa'],
+                                       alpha_guess=alpha_guess)
+            commands += "\n"
+        return commands + "Quit\n\n"
+
+    results = [None] * len(cases)
+    stdout = stderr = ''
+
+    def collect(indices):
+        # Returns the cases which didn't produce a complete st file
+        failed = []
+        for i in indices:
+            try:
+                results[i] = _read_derivs(derivs_files[i])
+            except AVLError:
+                failed.append(i)
+        return failed
+
+    if remaining:
+        stdout, stderr = _run_avl(case_commands(remaining), timeout * len(remaining), hide_output)
+    remaining = collect(range(len(cases)))
+
+    for i in remaining:
+        for attempt in range(retries):
+            alpha_guess = AVL_ALPHA_GUESSES[attempt % len(AVL_ALPHA_GUESSES)]
+            logger.warning(f'AVL case {i} failed, retry {attempt + 1} of {retries} from alpha = {alpha_guess}')
+            stdout, stderr = _run_avl(case_commands([i], alpha_guess), timeout, hide_output)
+            if not collect([i]):
+                break
+
+    failed = [i for i in range(len(cases)) if results[i] is None]
+    if failed:
+        raise AVLError(f'AVL failed to achieve trim conditions for case(s) {failed}',
+                       stdout=stdout, stderr=stderr, results=results)
+    return results
+
+
+def _run_avl(commands, timeout, hide_output=True):
+    """
+    Runs a one-shot avl process on a command stream, the process is killed if it takes longer than timeout seconds
+
+    :return: avl's stdout and stderr
+    """
+    try:
+        process = subprocess.run([AVL_EXECUTABLE],
+                                 input=commands,
+                                 capture_output=True,
+                                 text=True,
+                                 timeout=timeout)
+    except FileNotFoundError as e:
+        raise AVLError('AVL executable not found, please add to working directory or add avl to environment '
+                       'variables') from e
+    except subprocess.TimeoutExpired as e:
+        logger.warning(f'AVL did not finish in {timeout:.0f} s and was stopped')
+        return _decode(e.stdout), _decode(e.stderr)
+
+    if not hide_output:
+        print(process.stdout)
+    return process.stdout, process.stderr
+
+
+def _decode(output):
+    if isinstance(output, bytes):
+        return output.decode(errors='replace')
+    return output or ''
+
+
+def _fill_case(ac, case):
+    """ Fills in a run case's defaults and its geometry and mass file contents """
+    case = dict(case)
+    for name in ('mach', 'cd0', 'cdw', 'aoa'):
+        case.setdefault(name, None)
+    if case['cd0'] is None:
+        case['cd0'] = ac.cd0
+    if case['cdw'] is None:
+        case['cdw'] = ac.cdw
+    if 'geometry' not in case:
+        case['geometry'] = avl_geometry(ac, case['mach'])
+    if 'mass' not in case:
+        case['mass'] = avl_mass(ac, case['w'])
+    return case
 
 
 # runs specified case and saves results in derivs.st file
-def run_AVL(fc, ac, cd0=None, cdw=None, aoa=None, hide_output=True):
+def run_AVL(fc, ac, cd0=None, cdw=None, aoa=None, hide_output=True, session=None, directory=None, timeout=None):
+    """
+    Runs a single AVL case on the geometry and mass files written by AVL_input and saves the results in the derivs file
+
+    The files are read from and written to directory, which defaults to the aircraft's output directory.
+
+    If a session is passed (or one is attached to the aircraft as ac.avl_session) the case is run on that persistent
+    AVL process, otherwise a new avl process is started for the case. If the session's pipe dies the case is rerun
+    in one-shot mode.
+    """
 
     if cd0 is None:
         cd0 = ac.cd0
     if cdw is None:
         cdw = ac.cdw
 
-    output_dir = ac.output_dir
+    output_dir = directory or ac.output_dir
     derivs_file = os.path.join(output_dir, 'derivs')
 
-    # Conversion Factors
-    slg2kgm = 515.379
-    ft2m = 0.3048
-
     # %% Inputs
     geom_file = os.path.join(output_dir, f'{ac.file_prefix}_plane.avl')
     mass_file = os.path.join(output_dir, f'{ac.file_prefix}_mass.mass')
-    M = fc.mach
-    Cd0 = cd0 + cdw
-
-    a = fc.a * ft2m
-    V = M * a
 
     # %% XFOIL input file writer
     if os.path.exists(derivs_file):
         os.remove(derivs_file)
 
+    if session is None:
+        session = getattr(ac, 'avl_session', None)
+    if session is not None:
+        if session.run(geom_file, mass_file, fc, cd0 + cdw, derivs_file, aoa=aoa):
+            return
+        logger.warning('AVL session failed, falling back to a one-shot AVL run')
+
+    commands = (f"LOAD {geom_file}\n"
+                f"Mass {mass_file}\n"
+                f"MSET\n"
+                "0\n" +
+                _oper_commands(fc, cd0 + cdw, derivs_file, aoa=aoa) +
+                "\nQuit\n\n")
+    stdout, stderr = _run_avl(commands, AVL_TIMEOUT if timeout is None else timeout, hide_output)
+    if not os.path.exists(derivs_file):
+        raise AVLError('AVL failed to achieve trim conditions', stdout=stdout, stderr=stderr)
+
+
+def _oper_commands(fc, Cd0, derivs_file, aoa=None, alpha_guess=None):
+    """
+    Returns the OPER menu commands that run one case and write its stability derivatives to derivs_file
+
+    Starts from AVL's top level menu and leaves AVL in the OPER menu, a blank line returns it to the top level so cases
+    can be chained in a single AVL process. If alpha_guess is set, a case is first run at that angle of attack so the
+    trim starts from it.
+    """
+    # Conversion Factors
+    slg2kgm = 515.379
+    ft2m = 0.3048
+
+    M = fc.mach
+    a = fc.a * ft2m
+    V = M * a
+
     if aoa is not None:
         commands = (
-             f"LOAD {geom_file}\n"
-             f"Mass {mass_file}\n"
-             f"MSET\n"
-             "0\n"
              "Oper\n"
              f"a a {aoa}\n"
              f"D1 PM 0\n"
@@ -130,16 +478,13 @@ def run_AVL(fc, ac, cd0=None, cdw=None, aoa=None, hide_output=True):
              "G 9.81\n\n"
              "x\n"
              "st\n"
-             f"{derivs_file}\n\n"
-             "Quit\n\n"
+             f"{derivs_file}\n"
         )
     else:
-        commands = (f"LOAD {geom_file}\n"
-                    f"Mass {mass_file}\n"
-                    f"MSET\n"
-                    "0\n"
-                    "Oper\n"
-                    "C1\n"
+        commands = "Oper\n"
+        if alpha_guess is not None:
+            commands += f"a a {alpha_guess}\nx\n"
+        commands += ("C1\n"
                     "G 9.81\n"
                     f"D {fc.rho * slg2kgm}\n"
                     f"V {V}\n\n"
@@ -149,60 +494,205 @@ def run_AVL(fc, ac, cd0=None, cdw=None, aoa=None, hide_output=True):
                     f"CD {Cd0}\n\n"
                     "x\n"
                     "st\n"
-                    f"{derivs_file}\n\n"
-                    "Quit\n\n")
-    # Run avl
-    try:
-        if hide_output:
-            process = subprocess.run(['avl'],
-                                     input=commands.encode(),
-                                     stdout=subprocess.DEVNULL,
-                                     shell=True
-                                     )
-        else:
-            process = subprocess.run(['avl'],
-                                     input=commands.encode(),
-                                     shell=True
-                                     )
+                    f"{derivs_file}\n")
+    return commands
+
+
+class AVLSession:
+    """
+    Long-lived AVL process driven over pipes
+
+    Keeps a single avl process open and runs many OPER cases on it. The geometry and mass files are only reloaded
+    when their contents change, so a mission or a design sweep pays for AVL's start-up and geometry parsing once
+    instead of on every call.
+
+    Usage:
+        ac.avl_session = AVLSession()
+        ac.mission.run_case()
+        ac.avl_session.close()
+    """
+
+    def __init__(self, avl_path=None, timeout=30):
+        """
+        :param str avl_path: avl executable, defaults to AVL_EXECUTABLE
+        :param float timeout: seconds to wait for a single case before the session is considered dead
+        """
+        self.avl_path = avl_path or AVL_EXECUTABLE
+        self.timeout = timeout
+        self.n_cases = 0  # Number of cases run on the current process
+        self.n_loads = 0  # Number of times the geometry has been (re)loaded
+
+        self._process = None
+        self._scratch_dir = None
+        self._loaded_geometry = None  # Hash of the geometry file currently loaded in avl
+        self._loaded_mass = None  # Hash of the mass file currently loaded in avl
+        self._output = collections.deque(maxlen=500)  # Tail of avl's terminal output
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """ Starts the avl process, does nothing if it's already running """
+        if self.alive:
+            return
+        self._close()
+        self._scratch_dir = tempfile.mkdtemp(prefix='wuads_avl_')
+        self._process = subprocess.Popen([self.avl_path],
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT,
+                                         text=True,
+                                         bufsize=1)
+        # avl's prompts need to be drained or the pipe will fill up and block the process
+        reader = threading.Thread(target=self._read_output, args=(self._process.stdout,), daemon=True)
+        reader.start()
+
+    def run(self, geom_file, mass_file, fc, Cd0, derivs_file, aoa=None):
+        """
+        Runs one case and writes its stability derivatives to derivs_file
+
+        :return: True if avl finished the case, False if the process died or timed out. The session is closed on failure
+        """
+        with self._lock:
+            try:
+                self.start()
+                commands = ''
+                geometry = _file_hash(geom_file)
+                mass = _file_hash(mass_file)
+                if geometry != self._loaded_geometry:
+                    commands += f"LOAD {geom_file}\n"
+                    self._loaded_geometry = geometry
+                    self._loaded_mass = None
+                    self.n_loads += 1
+                if mass != self._loaded_mass:
+                    commands += f"Mass {mass_file}\nMSET\n0\n"
+                    self._loaded_mass = mass
+
+                # A second st file is written after the case's, once it exists the case's file has been closed
+                done_file = os.path.join(self._scratch_dir, 'done')
+                if os.path.exists(done_file):
+                    os.remove(done_file)
+                commands += _oper_commands(fc, Cd0, derivs_file, aoa=aoa)
+                commands += f"st\n{done_file}\n\n"
+
+                self._process.stdin.write(commands)
+                self._process.stdin.flush()
+
+                t_end = time.monotonic() + self.timeout
+                while not os.path.exists(done_file):
+                    if not self.alive or time.monotonic() > t_end:
+                        raise TimeoutError('AVL session stopped responding')
+                    time.sleep(.001)
+                self.n_cases += 1
+                return True
+
+            except (OSError, TimeoutError, ValueError) as e:
+                logger.warning(f'AVL session failed: {e}')
+                self._close()
+                return False
+
+    def close(self):
+        """ Shuts down the avl process and removes its scratch files """
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._process is not None:
+            if self._process.poll() is None:
+                try:
+                    self._process.stdin.write('\n\n\nQuit\n')
+                    self._process.stdin.flush()
+                    self._process.wait(timeout=1)
+                except (OSError, ValueError, subprocess.TimeoutExpired):
+                    self._process.kill()
+                    self._process.wait()
+            for stream in (self._process.stdin, self._process.stdout):
+                try:
+                    stream.close()
+                except (OSError, ValueError):
+                    pass
+        self._process = None
+        self._loaded_geometry = None
+        self._loaded_mass = None
+        if self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+
+    def _read_output(self, stream):
+        try:
+            for line in stream:
+                self._output.append(line)
+        except (OSError, ValueError):
+            pass
 
 
-    except FileNotFoundError:
-        logger.error('AVL.exe file not found, please add to working directory or add avl to environment variables')
-        sys.exit(1)
-        return
+def _file_hash(file_name):
+    with open(file_name, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
-# Imports lift and drag coefficients from output derivs.st file
-def import_coefficients(ac, seg):
-    derivs_file = os.path.join(ac.output_dir, 'derivs')
 
+def _copy_atomic(source, destination):
+    """ Copies source over destination so that readers never see a partially written file """
+    tmp_file = f'{destination}.{uuid.uuid4().hex}.tmp'
     try:
-        with open(derivs_file, 'r') as fid:
-            derivs = fid.readlines()[23:25]
-    except FileNotFoundError:
-        logger.error('AVL failed to achieve trim conditions')
-        sys.exit(1)
+        shutil.copyfile(source, tmp_file)
+        os.replace(tmp_file, destination)
+    except OSError as e:
+        logger.debug(f'Could not copy {source} to {destination}: {e}')
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
-    cl = []
-    for t in derivs[0].split():
-        try:
-            cl.append(float(t))
-        except ValueError:
-            pass
 
-    cd = []
-    for t in derivs[1].split():
-        try:
-            cd.append(float(t))
-        except ValueError:
-            pass
+def surrogate_coefficients(ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+    """ Coefficients from the aircraft's trained surrogate model, see surrogate.AeroSurrogate """
+    if getattr(ac, 'aero_surrogate', None) is None:
+        raise ValueError('The surrogate aero backend needs a trained AeroSurrogate in aircraft.aero_surrogate')
+    return ac.aero_surrogate.coefficients(ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+
+
+def polar_coefficients(ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+    """ Coefficients interpolated from the aircraft's drag polar, see drag_polar.DragPolar """
+    if getattr(ac, 'drag_polar', None) is None:
+        raise ValueError('The polar aero backend needs a DragPolar in aircraft.drag_polar')
+    return ac.drag_polar.coefficients(ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+
 
-    with open(derivs_file, 'r') as fid:
-        aoa_dat = fid.readlines()[15]
-    seg.cl = cl[0]
-    seg.cd = cd[0]
-    aoa = aoa_dat.split()
-    seg.aoa = float(aoa[2])
-    return cl[0], cd[0]
+# Aerodynamic analysis methods available to get_coefficients
+AERO_BACKENDS = {
+    'avl': avl_coefficients,
+    'vlm': vlm_coefficients,
+    'surrogate': surrogate_coefficients,
+    'polar': polar_coefficients,
+}
+
+
+# Imports lift and drag coefficients from output derivs.st file
+def import_coefficients(ac, seg, directory=None):
+    result = _read_derivs(os.path.join(directory or ac.output_dir, 'derivs'))
+    seg.avl_result = result
+    seg.cl = result.cl
+    seg.cd = result.cd
+    seg.aoa = result.alpha
+    return result.cl, result.cd
+
+
+def _read_derivs(derivs_file):
+    """ Reads an AVL st file, raises AVLError if AVL didn't write a complete one """
+    try:
+        result = AVLResult.from_file(derivs_file)
+    except FileNotFoundError:
+        raise AVLError('AVL failed to achieve trim conditions')
+    if result.cl is None or result.cd is None or result.alpha is None:
+        raise AVLError(f'Incomplete AVL output in {derivs_file}')
+    return result
 
 def mission_profile_report(aircraft, filename):
     with open(filename, 'w') as f:
@@ -262,7 +262,7 @@ class Fuselage(PhysicalComponent):
         self.cg = [self.length * .5 + self.xle, 0, 0]
         super().set_cg()
 
-    def update(self, variable, value):
+    def update(self, variable, value, **kwargs):
         """
         Allows for modifying a specific fuselage property (such as `width` or `height`)
         and recalculates derived attributes like `diameter` based on the updated value.
@@ -271,5 +271,5 @@ class Fuselage(PhysicalComponent):
         :param float value: The new value to set for the specified property.
         :param maintain_aspect_ratio: Indicates whether to maintain the aspect ratio between `width` and `height`.
         """
-        super().update(variable, value)
+        super().update(variable, value, **kwargs)
         self.diameter = .5 * (self.width + self.height)
\ No newline at end of file
@@ -153,6 +153,7 @@ class Wing(PhysicalComponent):
                 tc_list.append(self.tc)
 
 
+        # Each section is split into spanwise strips, evaluated together as arrays
         for i in range(len(self.avl_sections)-1):
             span = self.avl_sections[i+1][1] - self.avl_sections[i][1]
             if span == 0 :
@@ -168,39 +169,39 @@ class Wing(PhysicalComponent):
             dx = self.avl_sections[i+1][0] - self.avl_sections[i][0]
             sweep = np.arctan(dx/span)
 
-            t = ct / cr
-
-
             # Airfoil thickness
             tc = np.linspace(tc_list[i], tc_list[i+1], n_strips_section)
 
-            for i in range(n_strips_section):
-                # From Raymer
-                form_factor = ((1 + tc[i] * .6 / xc + 100 * tc[i] ** 4) * (1.34 * mach ** .18 * (np.cos(sweep)) ** .28))
-                # form_factor = ((1 + (2 - mach**2) * np.cos(self.sweep_quarter_chord) * tc[i] /
-                #                  np.sqrt(1 - mach**2 * np.cos(self.sweep_quarter_chord)**2)) +
-                #                  100 * tc[i]**4)
-                l_char = .5 * (chords[i] + chords[i+1])
-                area = l_char * dy * 2
-                # Set wetted surface area (Torenbeek - advanced aircraft design)
-                aspect_ratio = dy**2 / area
-                kq = 0.95
-                t = chords[i+1] / chords[i]
-                l_char = chords[i] * (2 / 3) * ((1 + t + t ** 2) / (1 + t))
-
-                Qw = kq * tc[i] * area * np.sqrt(area / aspect_ratio) / np.sqrt(1 + t)
-                s_wet = (2 + .5 * tc[i]) * (Qw * np.sqrt(aspect_ratio * (1 + t)) / (kq * tc[i])) ** (2 / 3)
-
-                # TODO Add shevell method
-                self.cd0 += super().parasite_drag(form_factor, l_char, flight_conditions, sref) * s_wet / self.s_wet
-
-    def set_wave_drag(self, aircraft, flight_conditions=None):
+            # From Raymer
+            form_factor = ((1 + tc * .6 / xc + 100 * tc ** 4) * (1.34 * mach ** .18 * (np.cos(sweep)) ** .28))
+            # form_factor = ((1 + (2 - mach**2) * np.cos(self.sweep_quarter_chord) * tc /
+            #                  np.sqrt(1 - mach**2 * np.cos(self.sweep_quarter_chord)**2)) +
+            #                  100 * tc**4)
+            area = .5 * (chords[:-1] + chords[1:]) * dy * 2
+            t = chords[1:] / chords[:-1]
+            l_char = chords[:-1] * (2 / 3) * ((1 + t + t ** 2) / (1 + t))
+
+            # Set wetted surface area of each strip (Torenbeek - advanced aircraft design), with the strip's aspect
+            # ratio dy^2 / area the volume term Qw cancels out and this reduces to (2 + tc / 2) * area
+            s_wet = (2 + .5 * tc) * area
+
+            # TODO Add shevell method
+            if sref != 0:
+                cf = self.skin_friction(l_char, flight_conditions)
+                self.cd0 += float(np.sum(cf * form_factor * self.Q * s_wet)) / sref
+
+    def set_wave_drag(self, aircraft, flight_conditions=None, weight=None):
         """
         Set wave drag for the wing
         Uses methods from Gur and Mason
         https://doi.org/10.2514/1.47557
 
+        Flight conditions can also be a FlightConditionsArray, which returns the wave drag at each of its conditions
+        without setting it, e.g. a drag rise curve over an array of Mach numbers.
+
         :param object aircraft: aircraft object which this wing belongs to.
+        :param flight_conditions: flight conditions, defaults to cruise
+        :param float weight: weight carried by the lift (lbs), defaults to the takeoff gross weight
 
         :return: Wave drag for the wing
         :rtype: int
@@ -208,26 +209,23 @@ class Wing(PhysicalComponent):
         fc = flight_conditions
         if fc is None:
             fc = aircraft.cruise_conditions
+        if weight is None:
+            weight = aircraft.weight_takeoff
 
         # split wing into strips
         n_strips = 40
-        chords = np.linspace(self.cr, self.ct, n_strips + 1)
-        chords = []
 
-        y_dist = np.linspace(self.yle, self.yle + self.span / 2, n_strips)
+        rho = np.asarray(fc.rho)[..., None]
+        v = np.asarray(fc.velocity)[..., None]
+        m = np.asarray(fc.mach)
 
-        dy = .5 * self.span / n_strips
-        rho = fc.rho
-        v = fc.velocity
-        m = fc.mach
-
-        if m < .5 or aircraft.sref == 0:
-            return 0
+        if np.all(m < .5) or aircraft.sref == 0:
+            return 0 if m.ndim == 0 else np.zeros(m.shape)
 
         # Eliptical lift distribution equations
-        lift = aircraft.weight_takeoff * .99
+        lift = weight * .99
         gamma_0 = lift / (.25 * np.pi * v * rho * self.span)
-        cdw = 0
+        cdw = np.zeros(m.shape)
 
         tc_list = []
         if len(self.airfoil_thickness) > 0:
@@ -242,6 +240,8 @@ class Wing(PhysicalComponent):
             while len(tc_list) < len(self.avl_sections):
                 tc_list.append(self.tc)
 
+        ka = .95  # TODO make an input to change the airfoil type
+        cos = np.cos(self.sweep_mid)
         for i in range(len(self.avl_sections) - 1):
             span = (self.avl_sections[i + 1][1] - self.avl_sections[i][1])
             if span == 0:
@@ -255,31 +255,30 @@ class Wing(PhysicalComponent):
             chords = np.linspace(cr, ct, n_strips_section + 1)
             tc = np.linspace(tc_list[i], tc_list[i + 1], n_strips_section)
 
-            dx = self.avl_sections[i + 1][0] - self.avl_sections[i][0]
-            sweep = np.arctan(dx / span)
             yle = self.avl_sections[i][1]
             y_dist = np.linspace(yle, yle + span, n_strips_section)
 
-            for j in range(n_strips_section):
-                cr_i = chords[j]
-                ct_i = chords[j + 1]
-                c = .5 * (cr_i + ct_i)
-                area = .5 * (cr_i + ct_i) * dy
-
-                # Elliptical lift dist
-                gamma = gamma_0 * np.sqrt(1 - (2 * (y_dist[j] - self.yle) / self.span) ** 2)
-                lprime = rho * v * gamma
-                cl = lprime / (.5 * rho * v ** 2 * c)
-                # Find the drag divergence number
-                ka = .95  # TODO make an input to change the airfoil type
-                cos = np.cos(self.sweep_mid)
-                mdd = (ka - cl / (10 * cos ** 2) - tc[j] / cos) / cos
-                mcr = mdd - .1077217
-
-                # Set section wave drag coefficient if applicable
-                if m > mcr:
-                    cdw += 20 * (m - mcr) ** 4 * (area / aircraft.sref) * 2
-
+            # Strips along the last axis, flight conditions along the others
+            c = .5 * (chords[:-1] + chords[1:])
+            area = c * dy
+
+            # Elliptical lift dist, strips outboard of the elliptical span (e.g. winglets) have no lift
+            with np.errstate(invalid='ignore'):
+                gamma = gamma_0 * np.sqrt(1 - (2 * (y_dist - self.yle) / self.span) ** 2)
+            lprime = rho * v * gamma
+            cl = lprime / (.5 * rho * v ** 2 * c)
+            # Find the drag divergence number
+            mdd = (ka - cl / (10 * cos ** 2) - tc / cos) / cos
+            mcr = mdd - .1077217
+
+            # Set section wave drag coefficient if applicable
+            m_strip = m[..., None]
+            supercritical = (m_strip > mcr) & (m_strip >= .5)
+            cdw += np.sum(np.where(supercritical, 20 * (m_strip - mcr) ** 4 * (area / aircraft.sref) * 2, 0), axis=-1)
+
+        if m.ndim > 0:
+            return cdw
+        cdw = float(cdw)
         self.cdw = cdw
         return cdw
 
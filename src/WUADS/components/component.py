@@ -131,14 +131,7 @@ class PhysicalComponent(Component):
         """
         # Parasite drag calculation - From Raymer
         # L is the characteristic length
-        rho = flight_conditions.rho
-        v = flight_conditions.velocity
-        mu = flight_conditions.mu
-        mach = flight_conditions.mach
-        Re = rho * v * l_char / mu
-        cflam = 1.328 / np.sqrt(Re)
-        cfturb = .455 / (np.log10(Re) ** 2.58 * (1 + .144 * mach ** 2) ** .65)
-        cf = self.laminar_percent * cflam + (1 - self.laminar_percent) * cfturb
+        cf = self.skin_friction(l_char, flight_conditions)
         # cf = .0055
 
 
@@ -149,7 +142,25 @@ class PhysicalComponent(Component):
             self.cd0 = cf * form_factor * self.Q * self.s_wet / sref
             return self.cd0
 
-    def set_wave_drag(self, aircraft, flight_conditions=None):
+    def skin_friction(self, l_char, flight_conditions):
+        """
+        Skin friction coefficient, blending the laminar and turbulent flat plate values by laminar_percent (Raymer)
+
+        :param l_char: characteristic length, a float or an array of lengths
+        :param object flight_conditions: flight conditions
+
+        :return: skin friction coefficient, with the shape of l_char
+        """
+        rho = flight_conditions.rho
+        v = flight_conditions.velocity
+        mu = flight_conditions.mu
+        mach = flight_conditions.mach
+        Re = rho * v * l_char / mu
+        cflam = 1.328 / np.sqrt(Re)
+        cfturb = .455 / (np.log10(Re) ** 2.58 * (1 + .144 * mach ** 2) ** .65)
+        return self.laminar_percent * cflam + (1 - self.laminar_percent) * cfturb
+
+    def set_wave_drag(self, aircraft, flight_conditions=None, weight=None):
         """
         Sets the wave drag to zero.
 
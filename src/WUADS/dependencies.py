@@ -0,0 +1,105 @@
+import collections
+import contextlib
+
+
+class DependencyGraph:
+    """
+    Tracks which derived quantities are out of date, and recomputes them only when they're used
+
+    Each derived quantity is registered with the function that computes it and the names it depends on, which can be
+    inputs (anything that's only invalidated, e.g. 'component:Main Wing') or other derived quantities. Invalidating a
+    name marks everything that depends on it as stale, and update recomputes a stale quantity after its own stale
+    dependencies. Quantities that aren't registered are never stale.
+
+    Usage:
+        graph = DependencyGraph()
+        graph.add('sref', update_sref, ['component:Main Wing'])
+        graph.add('cd0', update_cd0, ['sref', 'cruise_conditions'])
+        graph.invalidate('component:Main Wing')  # sref and cd0 are now stale
+        graph.update('cd0')  # recomputes sref, then cd0
+    """
+
+    def __init__(self):
+        self._compute = {}  # Function computing each derived quantity
+        self._dependencies = collections.defaultdict(set)
+        self._dependents = collections.defaultdict(set)
+        self._stale = set()
+        self._active = set()  # Quantities currently being computed
+        self.n_computed = collections.Counter()  # Number of times each quantity was computed
+
+    def add(self, name, compute, depends_on=()):
+        """
+        Registers a derived quantity, it starts out stale
+
+        :param str name: name of the quantity
+        :param compute: function called with no arguments to compute it
+        :param depends_on: names of the inputs and quantities it depends on
+        """
+        self._compute[name] = compute
+        for dependency in depends_on:
+            self._dependencies[name].add(dependency)
+            self._dependents[dependency].add(name)
+        self._stale.add(name)
+
+    def __contains__(self, name):
+        return name in self._compute or name in self._dependents
+
+    def invalidate(self, *names):
+        """ Marks the given quantities, and everything depending on the given names, as stale """
+        stack = list(names)
+        for name in names:
+            if name in self._compute:
+                self._stale.add(name)
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent not in self._stale:
+                    self._stale.add(dependent)
+                    stack.append(dependent)
+
+    def invalidate_all(self):
+        self._stale.update(self._compute)
+
+    def is_stale(self, name):
+        return name in self._stale
+
+    @property
+    def stale(self):
+        """ Names of all the stale quantities """
+        return set(self._stale)
+
+    def update(self, name):
+        """ Recomputes a quantity if it's stale, after recomputing its stale dependencies """
+        if name not in self._stale or name in self._active:
+            return
+        with self.computing(name):
+            self._compute[name]()
+
+    @contextlib.contextmanager
+    def computing(self, *names):
+        """
+        Context for computing quantities, either from update or directly
+
+        Their stale dependencies are brought up to date first. The quantities aren't recomputed if they're read while
+        they're being computed, and once they're done they're up to date while everything depending on them becomes
+        stale.
+        """
+        names = [name for name in names if name not in self._active]
+        for name in names:
+            for dependency in self._dependencies.get(name, ()):
+                if dependency not in names:
+                    self.update(dependency)
+        self._active.update(names)
+        try:
+            yield
+        finally:
+            self._active.difference_update(names)
+        for name in names:
+            self._stale.discard(name)
+            self.n_computed[name] += 1
+        # Mark dependents stale separately, quantities computed together can depend on each other
+        stack = list(names)
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent not in self._stale and dependent not in names:
+                    self._stale.add(dependent)
+                    stack.append(dependent)
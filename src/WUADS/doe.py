@@ -0,0 +1,305 @@
+"""
+Design of experiments over aircraft variants
+
+Samples a box of component variables, the same (component, variable) pairs taken by Aircraft.update_component, and
+evaluates the weights, drag and mission range of each sample on a pool of workers. Engine parameters are varied through
+the 'propulsion' component, e.g. ('propulsion', 'thrust_sea_level', 20000, 28000).
+
+Each worker builds the base aircraft once and clones it for every sample, see Aircraft.clone. Each result is written to
+the output file as soon as its sample completes, so rows are in completion order, and a run that's interrupted picks up
+where it left off when it's started again. Records are put back in sample order when they're read. The output file is
+a csv file of the OUTPUTS, or a result_store.ResultStore to keep the component weights, drag breakdown and mission
+segments of every sample as well.
+
+Usage:
+    variables = [('Main Wing', 'area', 1200, 1500),
+                 ('Main Wing', 'sweep', 20, 30),
+                 ('Fuselage', 'length', 115, 135),
+                 ('propulsion', 'thrust_sea_level', 22000, 27000)]
+    records = run_doe('737-800.yml', variables, n_samples=200, method='sobol', output_file='doe.csv')
+"""
+import csv
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
+
+from .result_store import aircraft_record
+
+logger = logging.getLogger(__name__)
+
+PROPULSION = 'propulsion'  # Component name used for the engine parameters, see Aircraft.generate_propulsion
+OUTPUTS = ['weight_takeoff', 'weight_empty', 'cd0', 'cdw', 'range']
+
+# Engine parameters kept from the current engine when others are varied
+ENGINE_PARAMETERS = ['thrust_sea_level', 'thrust_cruise', 'sfc_sea_level', 'sfc_cruise', 'engine_data_file',
+                     'horse_power', 'fuel_consumption_rate', 'sfc_lb_per_hph']
+
+
+def full_factorial(n_variables, levels, seed=None):
+    """ Every combination of levels evenly spaced values of each variable, levels ** n_variables samples """
+    grid = np.meshgrid(*[np.linspace(0, 1, levels)] * n_variables, indexing='ij')
+    return np.stack([g.ravel() for g in grid], axis=-1)
+
+
+def latin_hypercube(n_variables, n_samples, seed=None):
+    """ Latin hypercube of n_samples samples """
+    from scipy.stats import qmc
+    return qmc.LatinHypercube(d=n_variables, seed=seed).random(n_samples)
+
+
+def sobol(n_variables, n_samples, seed=None):
+    """ First n_samples points of a scrambled Sobol sequence, balanced when n_samples is a power of 2 """
+    from scipy.stats import qmc
+    return qmc.Sobol(d=n_variables, seed=seed).random(n_samples)
+
+
+# Sampling methods by name, each is called as sampler(n_variables, n, seed) and returns samples in the unit hypercube
+SAMPLERS = {
+    'full_factorial': full_factorial,
+    'latin_hypercube': latin_hypercube,
+    'sobol': sobol
+}
+
+
+def generate_samples(variables, n_samples, method='latin_hypercube', seed=None):
+    """
+    Samples the design box
+
+    :param list variables: (component, variable, lower, upper) of each design variable
+    :param int n_samples: number of samples, or the number of levels of each variable for a full factorial
+    :param str method: sampling method, see SAMPLERS
+    :param int seed: random seed
+
+    :return: array with one row of variable values per sample
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f'Unknown sampling method {method}, options are: {", ".join(SAMPLERS)}')
+    bounds = np.array([var[2:4] for var in variables], dtype=float)
+    unit = SAMPLERS[method](len(variables), n_samples, seed)
+    return bounds[:, 0] + unit * (bounds[:, 1] - bounds[:, 0])
+
+
+def apply_sample(aircraft, variables, values):
+    """
+    Sets the design variables of an aircraft
+
+    :param aircraft: aircraft to change
+    :param list variables: (component, variable, ...) of each design variable
+    :param values: value of each variable
+    """
+    updates = []
+    propulsion = {}
+    for (component, variable, *_), value in zip(variables, values):
+        if component == PROPULSION:
+            propulsion[variable] = float(value)
+        else:
+            updates.append((component, variable, float(value)))
+
+    if updates:
+        aircraft.update_component(updates, maintain_aspect_ratio=False)
+    if propulsion:
+        engine = aircraft.propulsion
+        params = {'engine_type': engine.engine_type}
+        for name in ENGINE_PARAMETERS:
+            if hasattr(engine, name):
+                params[name] = getattr(engine, name)
+        params.update(propulsion)
+        aircraft.generate_propulsion(n_engines=aircraft.n_engines, **params)
+
+
+def evaluate_sample(aircraft, variables, values, run_mission=True, record=False):
+    """
+    Weights, drag and mission range of a copy of the aircraft with the design variables set
+
+    :param aircraft: base aircraft, it isn't changed
+    :param list variables: (component, variable, ...) of each design variable
+    :param values: value of each variable
+    :param bool run_mission: run the mission profile for the range, otherwise the range is nan
+    :param bool record: add the result_store.aircraft_record of the sample under 'aircraft'
+
+    :return: dict of the OUTPUTS
+    """
+    sample = aircraft.clone()
+    apply_sample(sample, variables, values)
+    outputs = {'weight_takeoff': sample.weight_takeoff,
+               'weight_empty': sample.weight_empty,
+               'cd0': sample.cd0,
+               'cdw': sample.cdw,
+               'range': math.nan}
+    if run_mission:
+        sample.mission.run_case(mute_output=True)
+        outputs['range'] = sample.mission.range
+    outputs = {name: float(value) for name, value in outputs.items()}
+    if record:
+        outputs['aircraft'] = aircraft_record(sample, segments=run_mission)
+    return outputs
+
+
+class CSVResults:
+    """
+    Results of a design of experiments in a csv file, one row per sample and one column per input and output
+
+    Rows are flushed as they're written. Reading the completed samples back drops a partly written last row, which is
+    what a crash leaves behind.
+    """
+
+    def __init__(self, file_name):
+        """
+        :param str file_name: csv file, appended to if it already exists
+        """
+        self.file_name = os.path.abspath(file_name)
+        self.columns = None
+        self._file = None
+        self._writer = None
+
+    def open(self, columns):
+        """
+        Opens the file for appending samples with the given columns
+
+        :param list columns: column names, the first is the sample index
+        :return: completed samples already in the file, as a dict of records by sample index in sample order
+        """
+        self.columns = list(columns)
+        completed = {}
+        if os.path.isfile(self.file_name):
+            with open(self.file_name, newline='') as f:
+                text = f.read()
+            # Only keep complete rows
+            text = text[:text.rfind('\n') + 1]
+            rows = list(csv.reader(text.splitlines()))
+            if rows and rows[0] != self.columns:
+                raise ValueError(f'{self.file_name} has columns {rows[0]}, expected {self.columns}')
+            for row in rows[1:]:
+                if len(row) == len(self.columns):
+                    record = dict(zip(self.columns, row))
+                    record = {name: (value if name == 'error' else float(value)) for name, value in record.items()}
+                    record[self.columns[0]] = int(record[self.columns[0]])
+                    completed[record[self.columns[0]]] = record
+            with open(self.file_name, 'w', newline='') as f:
+                f.write(text)
+            # Rows are written as samples complete, not in sample order
+            completed = dict(sorted(completed.items()))
+
+        self._file = open(self.file_name, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+        if not completed and self._file.tell() == 0:
+            self._writer.writeheader()
+            self._file.flush()
+        return completed
+
+    def write(self, records):
+        """ Appends records, each a dict with a value for every column """
+        self._writer.writerows(records)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_worker = threading.local()
+
+
+def _init_worker(config_file, variables, aero_backend):
+    from .aircraft import Aircraft
+    aircraft = Aircraft(config_file)
+    aircraft.aero_backend = aero_backend
+    for component, variable, *_ in variables:
+        params = getattr(aircraft.aero_components.get(component), 'params', {})
+        if variable in ('area', 'taper') and 'cr' in params:
+            # Wings defined by root and tip chord are converted to area and taper by their first area update
+            aircraft.update_component((component, 'area', aircraft.aero_components[component].area))
+    _worker.aircraft = aircraft
+
+
+def _run_sample(config_file, variables, aero_backend, index, values, run_mission, record):
+    try:
+        # Inside the try, so a base aircraft which can't be built is recorded against each sample like any other error
+        if getattr(_worker, 'aircraft', None) is None:
+            _init_worker(config_file, variables, aero_backend)
+        outputs = evaluate_sample(_worker.aircraft, variables, values, run_mission=run_mission, record=record)
+        outputs['error'] = ''
+    except Exception as e:
+        outputs = {name: math.nan for name in OUTPUTS}
+        outputs['error'] = f'{type(e).__name__}: {e}'
+    return index, outputs
+
+
+def run_doe(config_file, variables, n_samples, method='latin_hypercube', output_file='doe.csv', seed=None,
+            run_mission=True, aero_backend='avl', max_workers=None, use_processes=True, progress=None):
+    """
+    Runs a design of experiments over variants of an aircraft
+
+    Samples already in the output file are skipped, as long as they match this design, so an interrupted run can be
+    started again with the same arguments. A sample which fails is recorded with its error and nan outputs.
+
+    :param str config_file: aircraft input file the variants are based on
+    :param list variables: (component, variable, lower, upper) of each design variable, see the module docstring
+    :param int n_samples: number of samples, or the number of levels of each variable for a full factorial
+    :param str method: sampling method, see SAMPLERS
+    :param str output_file: csv file the results are written to, or a results object such as CSVResults or
+                            result_store.ResultStore
+    :param int seed: random seed for the sampling, needed to resume a latin hypercube or Sobol design
+    :param bool run_mission: run the mission profile of each sample for its range
+    :param str aero_backend: aero backend of the variants, see Aircraft.aero_backend
+    :param int max_workers: number of workers, defaults to the number of cores
+    :param bool use_processes: use a process pool, otherwise a thread pool is used
+    :param progress: function called as progress(n_completed, n_samples) after each sample
+
+    :return: list of records for every sample, in sample order
+    """
+    samples = generate_samples(variables, n_samples, method=method, seed=seed)
+    columns = ['sample'] + [f'{var[0]}.{var[1]}' for var in variables] + OUTPUTS + ['error']
+
+    results = output_file if hasattr(output_file, 'open') else CSVResults(output_file)
+    store_aircraft = getattr(results, 'aircraft_records', False)  # Results objects which keep the aircraft_record
+    completed = results.open(columns)
+    for index, record in completed.items():
+        if index >= len(samples) or not np.allclose([record[name] for name in columns[1:len(variables) + 1]],
+                                                    samples[index]):
+            results.close()
+            raise ValueError(f'Results in {output_file} are from a different design, sample {index} does not match')
+
+    pending = [i for i in range(len(samples)) if i not in completed]
+    if completed:
+        logger.info(f'Resuming design of experiments, {len(completed)} of {len(samples)} samples already complete')
+
+    n_completed = len(completed)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    try:
+        with executor_class(max_workers=max_workers) as executor:
+            futures = [executor.submit(_run_sample, config_file, variables, aero_backend, i, samples[i], run_mission,
+                                       store_aircraft) for i in pending]
+            try:
+                for future in as_completed(futures):
+                    index, outputs = future.result()
+                    record = {'sample': index}
+                    record.update(zip(columns[1:len(variables) + 1], (float(v) for v in samples[index])))
+                    record.update(outputs)
+                    n_completed += 1
+                    if record['error']:
+                        logger.warning(f'Sample {index} failed: {record["error"]}')
+
+                    # Written straight away, a slow sample doesn't hold back the ones after it
+                    results.write([record])
+                    record.pop('aircraft', None)
+                    completed[index] = record
+
+                    if progress is not None:
+                        progress(n_completed, len(samples))
+                    if n_completed % max(len(samples) // 20, 1) == 0 or n_completed == len(samples):
+                        logger.info(f'Design of experiments {n_completed} of {len(samples)} samples complete')
+            except BaseException:
+                # Don't wait for the remaining samples, they're run when the design is resumed. Executor.shutdown only
+                # takes cancel_futures from Python 3.9
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        results.close()
+
+    return [completed[i] for i in range(len(samples))]
@@ -0,0 +1,57 @@
+import collections
+
+
+class DragCache:
+    """
+    Cache for Aircraft.get_cd0 results
+
+    Parasite drag is keyed on the aircraft's geometry version, number of engines, altitude and mach number, and wave drag
+    additionally on the takeoff gross weight carried by the lift, so a mission rerun after a payload or fuel change only
+    recalculates the wave drag. Changing components through Aircraft.update_component, add_component or remove_component
+    gives a new geometry version, components edited directly aren't detected.
+
+    Usage:
+        ac.mission.run_case()
+        print(ac.drag_cache.stats())
+    """
+
+    def __init__(self, max_size=4096):
+        """
+        :param int max_size: Maximum number of results kept
+        """
+        self.max_size = max_size
+
+        self.hits = 0  # Lookups served from the cache
+        self.misses = 0  # Lookups which needed the drag to be calculated
+
+        self._results = collections.OrderedDict()
+
+    def get(self, key):
+        """ Returns the cached drag coefficient for key, or None if it hasn't been calculated """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def stats(self):
+        """ Returns the hit and miss counts, the fraction of lookups served from the cache and the number of results """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'size': len(self._results)}
+
+    def clear(self):
+        """ Clears the cached results and the statistics """
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
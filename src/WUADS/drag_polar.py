@@ -0,0 +1,97 @@
+import bisect
+import numpy as np
+
+from .avl_run import AERO_BACKENDS
+
+
+class DragPolar:
+    """
+    Drag polar of the aircraft at each flight condition, fit to a few runs of another aero backend, for sweeps over
+    weight such as a payload-range chart
+
+    At a fixed geometry and flight condition the trimmed induced drag is close to parabolic in the lift coefficient, and
+    the angle of attack close to linear. Cases whose lift coefficient lies between two already analyzed at the same
+    flight condition are interpolated, anything else is run on the backend and added to the fit. Cases at a fixed angle
+    of attack don't depend on the weight, so they're run on the backend once for each flight condition and angle.
+    Changes in the cg between the analyzed cases aren't accounted for.
+
+    Usage:
+        ac.drag_polar = DragPolar(backend='avl')
+        ac.aero_backend = 'polar'
+        ac.mission.run_case()
+    """
+
+    def __init__(self, backend='avl'):
+        """
+        :param str backend: aero backend the polar is fit to, see avl_run.AERO_BACKENDS
+        """
+        if backend == 'polar' or backend not in AERO_BACKENDS:
+            raise ValueError(f'A drag polar can not be fit to the "{backend}" aero backend')
+        self.backend = backend
+
+        self.n_predictions = 0  # Cases interpolated from the polar
+        self.n_fallbacks = 0  # Cases run on the backend
+
+        self._cases = {}  # Lift coefficient, induced drag coefficient and angle of attack of the analyzed cases
+        self._fixed_aoa = {}  # Lift coefficient and induced drag coefficient of cases at a fixed angle of attack
+
+    def coefficients(self, ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+        """
+        Polar replacement for avl_run.get_coefficients, runs the backend when the case can't be interpolated
+
+        :return: lift coefficient, drag coefficient, and angle of attack (deg)
+        """
+        if cd0 is None:
+            cd0 = ac.cd0
+        if cdw is None:
+            cdw = ac.cdw
+
+        # Cases are placed on the polar by the lift coefficient needed at weight w, which is what the backend trims to
+        cl = w / (fc.q * ac.sref)
+        key = (ac.geometry_version, fc.altitude, fc.mach, mach)
+        if aoa is not None:
+            if (key, aoa) in self._fixed_aoa:
+                self.n_predictions += 1
+                cl, cdi = self._fixed_aoa[key, aoa]
+                return cl, cd0 + cdw + cdi, aoa
+            self.n_fallbacks += 1
+            result = AERO_BACKENDS[self.backend](ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+            self._fixed_aoa[key, aoa] = result[0], result[1] - cd0 - cdw
+            return result
+
+        cases = self._cases.setdefault(key, [])
+        if len(cases) > 1 and cases[0][0] <= cl <= cases[-1][0]:
+            self.n_predictions += 1
+            cl, cdi, alpha = self.predict(cases, cl)
+            return cl, cd0 + cdw + cdi, alpha
+
+        self.n_fallbacks += 1
+        result = AERO_BACKENDS[self.backend](ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+        bisect.insort(cases, (cl, result[0], result[1] - cd0 - cdw, result[2]))
+        return result
+
+    @staticmethod
+    def predict(cases, cl):
+        """
+        Least squares fit of cdi = cdi_0 + k * cl^2 to the analyzed cases, with the backend's lift coefficient and the
+        angle of attack interpolated linearly between them
+
+        :param list cases: required lift coefficient, and the backend's lift coefficient, induced drag coefficient and
+                           angle of attack (deg) of each analyzed case, sorted by the required lift coefficient
+        :param float cl: required lift coefficient
+
+        :return: lift coefficient, induced drag coefficient and angle of attack (deg)
+        """
+        cl_required, cl_backend, cdi, alpha = np.array(cases).T
+        if cl_required[-1] == cl_required[0]:
+            return float(cl_backend.mean()), float(cdi.mean()), float(alpha.mean())
+        k, cdi_0 = np.polyfit(cl_required ** 2, cdi, 1)
+        return (float(np.interp(cl, cl_required, cl_backend)), float(cdi_0 + k * cl ** 2),
+                float(np.interp(cl, cl_required, alpha)))
+
+    def clear(self):
+        """ Forgets the analyzed cases """
+        self._cases.clear()
+        self._fixed_aoa.clear()
+        self.n_predictions = 0
+        self.n_fallbacks = 0
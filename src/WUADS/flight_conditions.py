@@ -1,72 +1,309 @@
+import functools
 import numpy as np
 
+# Constants
+G = 32.2  # gravity
+T0 = 519  # Rankine
+P0 = 2116  # lb/ft^2
+RHO0 = .0023769
+A0 = 1116  # ft/s
+L = 0.003575  # temp lapse rate (R/ft)
+R = 1716.5  # Gas Constant
+GAMMA = 1.4
+H_TROPOPAUSE = 36000  # Troposphere Ceiling
+BETA = 20790  # Stratosphere pressure scale height (ft)
+THETA_STRATOSPHERE = .752  # Temperature ratio in the stratosphere
+DELTA_STRATOSPHERE = .224  # Pressure ratio at which the stratosphere model takes over
+
+
+def standard_atmosphere(altitude):
+    """
+    Standard atmosphere properties at one or more altitudes
+
+    :param altitude: altitude (ft), a float or an array
+
+    :return: temperature (R), pressure (lb/ft^2), density (slug/ft^3), speed of sound (ft/s) and viscosity (slug/ft/s),
+             with the shape of altitude
+    """
+    altitude = np.asarray(altitude, dtype=float)
+    delta = ((T0 - L * altitude) / T0) ** (G / (L * R))
+    return _atmosphere_properties(altitude, delta < DELTA_STRATOSPHERE)
+
+
+def _atmosphere_properties(altitude, stratosphere):
+    """ Standard atmosphere properties, using the stratosphere model where stratosphere is true """
+    t = T0 - L * altitude
+    theta = t / T0
+    delta = theta ** (G / (L * R))
+
+    # Stratosphere Correction
+    if np.any(stratosphere):
+        dh = altitude - H_TROPOPAUSE
+        delta = np.where(stratosphere,
+                         THETA_STRATOSPHERE ** (G / (L * R)) * np.exp(-dh / BETA),
+                         delta)
+        theta = np.where(stratosphere, THETA_STRATOSPHERE, theta)
+        t = np.where(stratosphere, T0 * THETA_STRATOSPHERE, t)
+    sigma = delta / theta
+
+    # Sutherland's law (calculates in metric, converts back to imperial
+    c1 = 1.458e-6
+    S = 110.4
+    tref = t * 5 / 9  # Rankine to Kelvin
+    mu = c1 * (tref ** 1.5) / (tref + S)
+    mu *= .0208854  # metric to imperial
+
+    return t, delta * P0, sigma * RHO0, np.sqrt(GAMMA * R * t), mu
+
+
+# Altitude at which standard_atmosphere switches to the stratosphere model (ft)
+H_STRATOSPHERE = T0 * (1 - DELTA_STRATOSPHERE ** (L * R / G)) / L
+
+
+class AtmosphereTable:
+    """
+    Standard atmosphere tabulated on a dense altitude grid, for fast repeated lookups
+
+    The troposphere and stratosphere are tabulated separately, split at the altitude where standard_atmosphere
+    switches models, so the jump between them is reproduced exactly. Values are linearly interpolated, and
+    altitudes outside of the table fall back to standard_atmosphere. Single altitudes are looked up in plain python,
+    which is several times faster than evaluating the model with numpy.
+
+    Linear interpolation on a step h is within h^2 / 8 * max|f''| of the analytic model. error_bound holds this limit for
+    each property as a fraction of the property's smallest value in the table, with f'' taken from the analytic model
+    on a grid ten times finer than the table.
+
+    Usage:
+        use_atmosphere_table()  # FlightConditions now interpolate from a table
+        print(atmosphere_table().error_bound)
+    """
+
+    properties = ['temperature', 'pressure', 'rho', 'a', 'mu']
+
+    def __init__(self, h_min=-2000, h_max=100000, step=10):
+        """
+        :param float h_min: lowest altitude in the table (ft)
+        :param float h_max: highest altitude in the table (ft)
+        :param float step: largest altitude step in the table (ft)
+        """
+        self.h_min = h_min
+        self.h_max = h_max
+
+        self._pieces = []
+        bounds = []
+        for h0, h1, stratosphere in ((h_min, min(H_STRATOSPHERE, h_max), False),
+                                     (max(H_STRATOSPHERE, h_min), h_max, True)):
+            if h1 > h0:
+                n = int(np.ceil((h1 - h0) / step)) + 1
+                altitude = np.linspace(h0, h1, n)
+                values = np.column_stack(_atmosphere_properties(altitude, stratosphere))
+                self._pieces.append((h0, h1, (h1 - h0) / (n - 1), altitude, values.T.copy(), values.tolist()))
+
+                # Second derivative of each property on a finer grid
+                fine = np.linspace(h0, h1, 10 * (n - 1) + 1)
+                dh = fine[1] - fine[0]
+                f = np.column_stack(_atmosphere_properties(fine, stratosphere))
+                d2f = np.abs(np.diff(f, 2, axis=0)).max(axis=0) / dh ** 2
+                bounds.append((h1 - h0) ** 2 / (n - 1) ** 2 / 8 * d2f / np.abs(values).min(axis=0))
+
+        self.error_bound = dict(zip(self.properties, np.max(bounds, axis=0)))  # Relative interpolation error limit
+
+    def __call__(self, altitude):
+        """
+        Interpolated standard atmosphere properties, see standard_atmosphere
+
+        :param altitude: altitude (ft), a float or an array
+
+        :return: temperature (R), pressure (lb/ft^2), density (slug/ft^3), speed of sound (ft/s) and viscosity
+                 (slug/ft/s)
+        """
+        if isinstance(altitude, (int, float, np.number)):
+            # Plain python for single altitudes, numpy's overhead is larger than the interpolation itself
+            altitude = float(altitude)
+            for h0, h1, step, grid, values, rows in self._pieces:
+                if h0 <= altitude <= h1 and (altitude > H_STRATOSPHERE) == (h0 >= H_STRATOSPHERE):
+                    x = (altitude - h0) / step
+                    i = min(int(x), len(rows) - 2)
+                    w = x - i
+                    r0 = rows[i]
+                    r1 = rows[i + 1]
+                    return (r0[0] + w * (r1[0] - r0[0]), r0[1] + w * (r1[1] - r0[1]), r0[2] + w * (r1[2] - r0[2]),
+                            r0[3] + w * (r1[3] - r0[3]), r0[4] + w * (r1[4] - r0[4]))
+            return tuple(float(f) for f in standard_atmosphere(altitude))
+
+        altitude = np.asarray(altitude, dtype=float)
+        h = altitude.ravel()
+        result = np.empty((h.size, 5))
+        covered = np.zeros(h.size, dtype=bool)
+        for h0, h1, step, grid, values, rows in self._pieces:
+            mask = (h >= h0) & (h <= h1) & ((h > H_STRATOSPHERE) == (h0 >= H_STRATOSPHERE))
+            for k in range(5):
+                result[mask, k] = np.interp(h[mask], grid, values[k])
+            covered |= mask
+        if not covered.all():
+            result[~covered] = np.column_stack(standard_atmosphere(h[~covered]))
+        return tuple(result[:, k].reshape(altitude.shape) for k in range(5))
+
+
+_atmosphere_table = None
+
+
+def use_atmosphere_table(enabled=True, **kwargs):
+    """
+    Switches FlightConditions between the analytic standard atmosphere and an interpolated AtmosphereTable
+
+    :param bool enabled: use the table
+    :param kwargs: AtmosphereTable arguments, the table is rebuilt if any are given
+    """
+    global _atmosphere_table
+    if not enabled:
+        _atmosphere_table = None
+    elif _atmosphere_table is None or kwargs:
+        _atmosphere_table = AtmosphereTable(**kwargs)
+    # Interned FlightConditions were calculated with the previous model
+    _interned_flight_conditions.cache_clear()
+
+
+def atmosphere_table():
+    """ Returns the AtmosphereTable in use, or None if FlightConditions use the analytic model """
+    return _atmosphere_table
+
+
+def atmosphere(altitude):
+    """
+    Standard atmosphere properties from the table if it's enabled, otherwise from standard_atmosphere
+
+    Arrays of altitudes always use standard_atmosphere, evaluating the model over an array is already cheaper than
+    interpolating it.
+    """
+    if _atmosphere_table is not None and isinstance(altitude, (int, float, np.number)):
+        return _atmosphere_table(altitude)
+    return standard_atmosphere(altitude)
+
 
 # Calculates atmospheric conditions and flight conditions with a given height and mach number
 class FlightConditions:
     """
     Calculates atmospheric and flight conditions for a given altitude and Mach number.
 
+    Instances are immutable and interned, constructing the same altitude and Mach number again returns the existing
+    object from a bounded cache rather than recalculating it.
+
+    See FlightConditionsArray for arrays of altitudes and Mach numbers, and use_atmosphere_table to interpolate the
+    atmosphere from a table instead of evaluating it directly.
     """
 
-    def __init__(self, altitude, mach):
+    __slots__ = ('altitude', 'mach', 'temperature', 'pressure', 'rho', 'a', 'mu', 'velocity', 'q', 're', 'gamma',
+                 'rho0')
+
+    def __new__(cls, altitude, mach):
         """
         Initializes the FlightConditions object with the specified altitude and Mach number.
 
         :param float altitude: altitude (ft)
         :param float mach: mach number
         """
+        try:
+            return _interned_flight_conditions(cls, altitude, mach)
+        except TypeError:
+            # Unhashable inputs aren't interned
+            return cls._create(altitude, mach)
+
+    @classmethod
+    def _create(cls, altitude, mach):
+        self = object.__new__(cls)
+        t, p, rho, a, mu = (float(x) for x in atmosphere(altitude))
+        velocity = mach * a
+
+        set_value = object.__setattr__
+        set_value(self, 'gamma', GAMMA)
+        set_value(self, 'rho0', RHO0)  # Sea level density
+        set_value(self, 'temperature', t)  # Temperature (R)
+        set_value(self, 'pressure', p)  # Pressure (lb/ft^2)
+        set_value(self, 'rho', rho)  # Density (slug/ft^3)
+        set_value(self, 'a', a)  # Speed of sound (ft/s)
+        set_value(self, 'mu', mu)  # Dynamic viscosity (slug/ft/s)
+        set_value(self, 'velocity', velocity)
+        set_value(self, 'mach', mach)
+        set_value(self, 'q', .5 * rho * velocity ** 2)
+        set_value(self, 're', rho * velocity / mu)  # Reynolds number per foot
+        set_value(self, 'altitude', altitude)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FlightConditions are immutable, create a new FlightConditions instead')
+
+    def __delattr__(self, name):
+        raise AttributeError('FlightConditions are immutable, create a new FlightConditions instead')
+
+    def __reduce__(self):
+        return self.__class__, (self.altitude, self.mach)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, FlightConditions):
+            return NotImplemented
+        return self.altitude == other.altitude and self.mach == other.mach
+
+    def __hash__(self):
+        return hash((self.altitude, self.mach))
+
+    def __repr__(self):
+        return f'FlightConditions(altitude={self.altitude}, mach={self.mach})'
+
+
+@functools.lru_cache(maxsize=4096)
+def _interned_flight_conditions(cls, altitude, mach):
+    return cls._create(altitude, mach)
+
+
+class FlightConditionsArray:
+    """
+    Vectorized FlightConditions, calculates atmospheric and flight conditions over arrays of altitudes and Mach numbers
+    in one call
+
+    Altitude and mach are broadcast against each other, e.g. a column of altitudes and a row of Mach numbers gives the
+    whole flight envelope. Each attribute is an array of the broadcast shape, and the values match FlightConditions.
+
+    Usage:
+        fc = FlightConditionsArray(np.linspace(0, 40000, 41)[:, None], np.linspace(.2, .85, 14))
+        fc.q  # dynamic pressure, shape (41, 14)
+    """
+
+    def __init__(self, altitude, mach):
+        """
+        :param altitude: altitudes (ft)
+        :param mach: mach numbers
+        """
+        altitude, mach = np.broadcast_arrays(np.asarray(altitude, dtype=float), np.asarray(mach, dtype=float))
+        t, p, rho, a, mu = atmosphere(altitude)
 
-        self.pressure = 0
-        self.temperature = 0
-        self.rho0 = 0
-        self.mu = 0
-        self.a = 0
-        self.velocity = 0
-        self.mach = 0
-        self.q = 0
-        self.re = 0
-        self.altitude = 0
-        self.gamma = 1.4
-
-        # Constants
-        g = 32.2  # gravity
-        t0 = 519  # Rankine
-        p0 = 2116  # lb/ft^2
-        rho0 = .0023769
-        a0 = 1116  # ft/s
-        L = 0.003575  # temp lapse rate (R/ft)
-        R = 1716.5  # Gas Constant
-        gamma = 1.4
-
-        t = t0 - L * altitude
-        theta = t / t0
-        delta = theta ** (g / (L * R))
-        p = delta * p0
-        sigma = delta / theta
-
-        # Stratosphere Correction
-        if delta < 0.224:
-            h0 = 36000  # Troposphere Ceiling
-            beta = 20790
-            dh = altitude - 36000
-            theta = .752
-            delta = theta ** (g / (L * R)) * np.exp(-dh / beta)
-            sigma = delta / theta
-            t = t0 * theta
-
-        # Sutherland's law (calculates in metric, converts back to imperial
-        c1 = 1.458e-6
-        S = 110.4
-        tref = t * 5 / 9  # Rankine to Kelvin
-        self.mu = c1 * (tref ** 1.5) / (tref + S)
-        self.mu *= .0208854  # metric to imperial
-
-        self.temperature = t
-        self.pressure = delta * p0
-        self.rho = sigma * rho0
-        self.a = np.sqrt(gamma * R * t)
-
-        self.velocity = mach * self.a
+        self.gamma = GAMMA
+        self.rho0 = RHO0  # Sea level density
+        self.temperature = t  # Temperature (R)
+        self.pressure = p  # Pressure (lb/ft^2)
+        self.rho = rho  # Density (slug/ft^3)
+        self.a = a  # Speed of sound (ft/s)
+        self.mu = mu  # Dynamic viscosity (slug/ft/s)
+
+        self.velocity = mach * a
         self.mach = mach
-        self.q = .5 * self.rho * self.velocity ** 2
+        self.q = .5 * rho * self.velocity ** 2
+        self.re = rho * self.velocity / mu  # Reynolds number per foot
         self.altitude = altitude
+
+    @property
+    def shape(self):
+        return self.altitude.shape
+
+    def __len__(self):
+        return len(self.altitude)
+
+    def __getitem__(self, index):
+        """ Returns the FlightConditions of a single case """
+        return FlightConditions(float(self.altitude[index]), float(self.mach[index]))
@@ -4,8 +4,6 @@ import sys
 import argparse
 from pathlib import Path
 from importlib import resources
-from PySide6.QtWidgets import QApplication
-from .main_window import MainWindow
 from ..aircraft import Aircraft  # Handles loading config internally
 
 def main():
@@ -30,6 +28,10 @@ def main():
 
     aircraft = Aircraft(config_path)  # Pass path directly to Aircraft
 
+    # Qt is only imported once the GUI is actually started
+    from PySide6.QtWidgets import QApplication
+    from .main_window import MainWindow
+
     app = QApplication(sys.argv)
     window = MainWindow(aircraft=aircraft)
     window.show()
@@ -75,7 +75,7 @@ class propulsion_input(QWidget):
 
     def open_engine_data_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Data File", "", "Excel Files (*.xlsx);;All Files (*)"
+            self, "Select Data File", "", "Engine Decks (*.xlsx *.npy);;All Files (*)"
         )
         if file_path:
             self.file_input.setText(file_path)
@@ -1,5 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from .mission_segments import takeoff, climb, cruise, descent, landing, loiter, weight_drop
+from .avl_run import get_coefficients_batch
+from .drag_polar import DragPolar
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -69,13 +73,22 @@ class Mission:
         Runs mission profile calculations using the user-defined mission profile.
         Assumes self.mission_profile is already populated with valid mission segments.
         """
-        aircraft = self.aircraft
-        mission_profile = self.mission_profile  # use the existing mission profile defined by user
-        wi = aircraft.weight_takeoff
+        if not mute_output:
+            logger.info("Generating mission profile...")
 
+        self.prefetch_coefficients()
 
+        max_range = self._fly_profile(mute_output)
         if not mute_output:
-            logger.info("Generating mission profile...")
+            logger.info(f"Analysis complete, maximum range is {max_range}")
+        self.aircraft.range = max_range
+        self.range = max_range
+
+    def _fly_profile(self, mute_output=True):
+        """ Analyzes each mission segment at the aircraft's current weights and returns the total range (nmi) """
+        aircraft = self.aircraft
+        mission_profile = self.mission_profile  # use the existing mission profile defined by user
+        wi = aircraft.weight_takeoff
 
         # Forward loop: compute weight fractions and range up to the find_range segment
         seg_findrange = None
@@ -109,9 +122,161 @@ class Mission:
             seg_findrange.set_range(aircraft, wi=wi, wn=wn)
 
         # Sum total mission range
-        max_range = sum(seg.range for seg in mission_profile)
-        if not mute_output:
-            logger.info(f"Analysis complete, maximum range is {max_range}")
-        aircraft.range = max_range
-        self.mission_profile = mission_profile  # store updated mission profile
-        self.range = max_range
+        return sum(seg.range for seg in mission_profile)
+
+    def payload_range(self, n_points=50, mtow=None, mzfw=None, max_fuel=None, max_payload=None, drag_polar=None):
+        """
+        Payload-range chart of the aircraft, from the maximum payload at zero range to the ferry range
+
+        Payload is traded for fuel at the maximum takeoff weight until the tanks are full, after which payload is
+        removed at full fuel. The component weights are held at their current values, as with
+        Aircraft.lock_component_weights, so each point only adds up the weights again. The aerodynamic coefficients come
+        from a drag polar fit to the first few runs of the aircraft's aero backend at each mission segment, see
+        drag_polar.DragPolar, so AVL typically only runs twice per segment for the whole chart. Payload is removed as
+        cargo first, then passengers. The aircraft and its mission are left as they were.
+
+        :param int n_points: number of payloads analyzed between the maximum payload and no payload
+        :param float mtow: maximum takeoff weight (lbs), defaults to the aircraft's
+        :param float mzfw: maximum zero fuel weight (lbs), limits the payload if set
+        :param float max_fuel: fuel capacity (lbs), defaults to the fuel weight the fuel system was sized for
+        :param float max_payload: maximum payload (lbs), defaults to the current passengers and cargo
+        :param drag_polar: drag_polar.DragPolar to use, defaults to a new one fit to the aircraft's aero backend
+
+        :return: PayloadRange
+        """
+        aircraft = self.aircraft
+        useful_load = aircraft.useful_load
+
+        n_passengers = useful_load.n_passengers
+        w_passengers = n_passengers * 165
+        w_cargo = useful_load.w_cargo
+        w_fuel = aircraft.w_fuel
+        oew = aircraft.weight_takeoff - w_passengers - w_cargo - w_fuel  # Operating empty weight, includes the crew
+
+        if mtow is None:
+            mtow = aircraft.weight_max
+        if max_fuel is None:
+            max_fuel = w_fuel
+        if max_payload is None:
+            max_payload = w_passengers + w_cargo
+        if mzfw is not None:
+            max_payload = min(max_payload, mzfw - oew)
+        max_payload = max(min(max_payload, mtow - oew), 0)
+
+        payload_full_fuel = min(max(mtow - oew - max_fuel, 0), max_payload)
+        payload = np.unique(np.append(np.linspace(0, max_payload, n_points), payload_full_fuel))[::-1]
+        fuel = np.clip(np.minimum(max_fuel, mtow - oew - payload), 0, None)
+        mission_range = np.zeros(len(payload))
+        corners = {'max_payload': 0,
+                   'max_fuel': int(np.flatnonzero(payload == payload_full_fuel)[0]),
+                   'ferry': len(payload) - 1}
+
+        if drag_polar is None:
+            drag_polar = aircraft.drag_polar if aircraft.aero_backend == 'polar' else DragPolar(aircraft.aero_backend)
+        state = (aircraft.aero_backend, aircraft.drag_polar, aircraft.lock_component_weights, aircraft.weight_iterations)
+        segment_states = [dict(seg.__dict__) for seg in self.mission_profile]
+        aircraft.aero_backend = 'polar'
+        aircraft.drag_polar = drag_polar
+        if not aircraft.lock_component_weights:
+            aircraft.lock_component_weights = True
+        try:
+            # Corners first, so the polars are fit at the heaviest and lightest weights and the rest are interpolated
+            order = list(dict.fromkeys([*corners.values(), *range(len(payload))]))
+            for i in order:
+                if fuel[i] <= 0:
+                    continue
+                passengers = min(payload[i], w_passengers)
+                useful_load.n_passengers = passengers / 165
+                aircraft.w_cargo = payload[i] - passengers
+                aircraft.w_fuel = fuel[i]
+                aircraft.dependencies.invalidate('useful_load')
+                mission_range[i] = self._fly_profile()
+        finally:
+            useful_load.n_passengers = n_passengers
+            aircraft.w_cargo = w_cargo
+            aircraft.w_fuel = w_fuel
+            aircraft.dependencies.invalidate('useful_load')
+            # Add the original weights up again before the components are unlocked
+            aircraft.dependencies.update('weight')
+            aircraft.aero_backend, aircraft.drag_polar, locked, aircraft.weight_iterations = state
+            aircraft.lock_component_weights = locked
+            for seg, seg_state in zip(self.mission_profile, segment_states):
+                seg.__dict__.update(seg_state)
+
+        logger.debug(f'Payload-range aero cases: {drag_polar.n_predictions} interpolated, '
+                     f'{drag_polar.n_fallbacks} analyzed')
+
+        # The curve starts from the maximum payload at zero range
+        return PayloadRange(payload=np.insert(payload, 0, max_payload),
+                            fuel=np.insert(fuel, 0, 0),
+                            mission_range=np.insert(mission_range, 0, 0),
+                            weight_empty_operating=oew,
+                            corners={name: i + 1 for name, i in corners.items()},
+                            limits={'mtow': mtow, 'mzfw': mzfw, 'max_fuel': max_fuel, 'max_payload': max_payload})
+
+    def prefetch_coefficients(self):
+        """
+        Runs the aerodynamic cases which don't depend on earlier segments together in a single AVL process, the
+        segments then pick their results up from the aircraft's AVL cache
+        """
+        aircraft = self.aircraft
+        if getattr(aircraft, 'aero_backend', 'avl') != 'avl' or aircraft.avl_cache is None:
+            return
+        cases = [seg.aero_case(aircraft) for seg in self.mission_profile]
+        cases = [case for case in cases if case is not None]
+        if len(cases) > 1:
+            get_coefficients_batch(aircraft, cases)
+
+
+class PayloadRange:
+    """
+    Payload-range chart from Mission.payload_range
+
+    Points run from the maximum payload at zero range to the ferry range with no payload. corners holds the index of
+    the maximum payload at the maximum takeoff weight ('max_payload'), of full fuel at the maximum takeoff weight
+    ('max_fuel') and of the ferry range ('ferry').
+    """
+
+    def __init__(self, payload, fuel, mission_range, weight_empty_operating, corners, limits):
+        self.payload = payload  # Payload (lbs)
+        self.fuel = fuel  # Fuel at takeoff (lbs)
+        self.range = mission_range  # Range (nmi)
+        self.weight_takeoff = weight_empty_operating + payload + fuel  # Takeoff weight (lbs)
+        self.weight_empty_operating = weight_empty_operating  # Operating empty weight, including the crew (lbs)
+        self.corners = corners
+        self.limits = limits  # Maximum takeoff weight, zero fuel weight, fuel and payload (lbs)
+
+    def corner(self, name):
+        """ Payload, fuel, takeoff weight and range at one of the corners """
+        i = self.corners[name]
+        return {'payload': float(self.payload[i]),
+                'fuel': float(self.fuel[i]),
+                'weight_takeoff': float(self.weight_takeoff[i]),
+                'range': float(self.range[i])}
+
+    def payload_at(self, mission_range):
+        """ Largest payload (lbs) which can be flown a range (nmi), nan beyond the ferry range """
+        return np.interp(mission_range, self.range, self.payload, right=np.nan)
+
+
+def run_cases(aircraft, max_workers=None, use_processes=True):
+    """
+    Runs the mission profile of several aircraft in parallel
+
+    Each AVL run works in its own scratch directory, so aircraft variants can be analyzed on all cores at once.
+
+    :param list aircraft: aircraft to analyze
+    :param int max_workers: number of workers, defaults to the number of cores
+    :param bool use_processes: use a process pool, otherwise a thread pool is used
+
+    :return: the analyzed aircraft, in the same order. When using processes these are copies of the inputs, without
+             their cached results, see Aircraft.__getstate__
+    """
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        return list(executor.map(_run_case, aircraft))
+
+
+def _run_case(aircraft):
+    aircraft.mission.run_case(mute_output=True)
+    return aircraft
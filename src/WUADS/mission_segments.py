@@ -2,7 +2,7 @@ import os
 import subprocess
 
 from .flight_conditions import FlightConditions
-from .avl_run import run_AVL, AVL_input, import_coefficients
+from .avl_run import get_coefficients
 import numpy as np
 import sys
 
@@ -46,6 +46,13 @@ class MissionSegment:
     def breguet_range(self, aircraft, wi):
         return 0, 0, 0, 0, 0
 
+    def aero_case(self, aircraft):
+        """
+        Returns the segment's aerodynamic run case if it doesn't depend on earlier segments, so it can be run ahead of
+        time with the rest of the mission's cases. None if the segment has no such case.
+        """
+        return None
+
 
 class takeoff(MissionSegment):
 
@@ -125,6 +132,18 @@ class climb(MissionSegment):
         fc = FlightConditions(self.altitude, self.mach)
         self.flight_conditions = fc
 
+    def aero_case(self, aircraft):
+        # Climb is analyzed at the takeoff weight, so it's independent of the rest of the mission
+        if not self.run_sim:
+            return None
+        cd0, cdw = aircraft.get_cd0(self.altitude, self.mach)
+        if self.set_aoa:
+            aoa = self.aoa
+        else:
+            aoa = None
+        return {'fc': self.flight_conditions, 'w': aircraft.weight_takeoff, 'mach': self.mach, 'cd0': cd0, 'cdw': cdw,
+                'aoa': aoa}
+
     def breguet_range(self, aircraft, wi=None, wn=None):
         #propeller_engine_adjust(self, aircraft)
 
@@ -138,15 +157,7 @@ class climb(MissionSegment):
             weight = wn
 
         if self.run_sim:
-            if self.set_aoa:
-                aoa = self.aoa
-            else:
-                aoa = None
-
-            AVL_input(aircraft, aircraft.weight_takeoff, mach=self.mach)
-            run_AVL(self.flight_conditions, aircraft, cd0=cd0, cdw=cdw, aoa=aoa, hide_output=True)
-
-            self.cl, self.cd = import_coefficients(aircraft, self)
+            self.cl, self.cd, self.aoa = get_coefficients(aircraft, **self.aero_case(aircraft))
         else:
             self.cl = aircraft.weight_takeoff / (self.flight_conditions.q * aircraft.sref)* 1.3
             a = aircraft.aero_components['Main Wing'].aspect_ratio
@@ -241,9 +252,7 @@ class cruise(MissionSegment):
             self.wn = wn
             weight = wn
 
-        AVL_input(aircraft, weight)
-        run_AVL(self.flight_conditions, aircraft)
-        self.cl, self.cd = import_coefficients(aircraft, self)
+        self.cl, self.cd, self.aoa = get_coefficients(aircraft, self.flight_conditions, weight)
         self.lift_to_drag = self.cl / self.cd
 
         self.sfc, max_thrust = aircraft.propulsion.analyze_performance(self.flight_conditions.altitude,
@@ -265,9 +274,7 @@ class cruise(MissionSegment):
         self.wn = wn
         # self.wi = (wi + wn) / 2
 
-        AVL_input(aircraft, self.wi)
-        run_AVL(self.flight_conditions, aircraft)
-        self.cl, self.cd = import_coefficients(aircraft, self)
+        self.cl, self.cd, self.aoa = get_coefficients(aircraft, self.flight_conditions, self.wi)
         self.lift_to_drag = self.cl / self.cd
 
         self.weight_fraction = wn / wi
@@ -349,10 +356,8 @@ class loiter(MissionSegment):
             weight = wn
 
         if self.run_sim:
-            AVL_input(aircraft, weight, mach=self.mach)
-            run_AVL(self.flight_conditions, aircraft, cd0=cd0, cdw=cdw)
-
-            self.cl, self.cd = import_coefficients(aircraft, self)
+            self.cl, self.cd, self.aoa = get_coefficients(aircraft, self.flight_conditions, weight, mach=self.mach,
+                                                          cd0=cd0, cdw=cdw)
             K = (self.cd - cd0) / self.cl ** 2
             self.K = K
         else:
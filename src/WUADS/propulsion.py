@@ -1,7 +1,8 @@
+import bisect
+import hashlib
 import logging
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment
+import os
+import uuid
 from .flight_conditions import FlightConditions
 import numpy as np
 
@@ -114,11 +115,59 @@ class turbofan(engine):
                                thrust_cruise=thrust_cruise,
                                sfc_cruise=sfc_cruise, sfc_sea_level=sfc_sea_level)
 
+    # The engine deck tables are read only, so the interpolation table built from them stays valid. They're changed
+    # by assigning a whole new table, e.g. engine.thrust_input = engine.thrust_input * 1.1
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Copied and unpickled arrays are writable again
+        for name in ('_altitude_ref', '_mach_ref', '_thrust_input', '_sfc_input'):
+            if name in state:
+                state[name].flags.writeable = False
+
+    @property
+    def altitude_ref(self):
+        return self._altitude_ref
+
+    @altitude_ref.setter
+    def altitude_ref(self, altitudes):
+        self._altitude_ref = _read_only(altitudes)
+        self._table = None
+
+    @property
+    def mach_ref(self):
+        return self._mach_ref
+
+    @mach_ref.setter
+    def mach_ref(self, machs):
+        self._mach_ref = _read_only(machs)
+        self._table = None
+
+    @property
+    def thrust_input(self):
+        return self._thrust_input
+
+    @thrust_input.setter
+    def thrust_input(self, thrust):
+        self._thrust_input = _read_only(thrust)
+        self._table = None
+
+    @property
+    def sfc_input(self):
+        return self._sfc_input
+
+    @sfc_input.setter
+    def sfc_input(self, sfc):
+        self._sfc_input = _read_only(sfc)
+        self._table = None
+
     def analyze_performance(self, height, mach, thrust_required=None):
         """
         Find the maximum available thrust and specific fuel consumption at an input altitude, mach number,
         and required thrust
 
+        Inputs can be floats or arrays, arrays are broadcast against each other and evaluated in one call. Values
+        outside of the engine deck are extrapolated linearly from the nearest cells.
 
         :param float height: Altitude (ft)
         :param float mach: Mach Number
@@ -129,76 +178,35 @@ class turbofan(engine):
         :return float max_thrust: Maximum thrust at input conditions (lbs)
 
         """
-        if mach > self.mach_ref[-1]:  # TODO edit interpolation to include mach and altitudes outside input list
-            mach = self.mach_ref[-1] - .001
-
-        # Find values to interpolate between
-
-        # altitude
-        if height <= self.altitude_ref[0]:
-            x_indx_low = 0
-            x_indx_high = 1
-            x1 = self.altitude_ref[0]
-            x2 = self.altitude_ref[1]
-        elif height >= self.altitude_ref[-1]:
-            x_indx_low = len(self.altitude_ref) - 2
-            x_indx_high = len(self.altitude_ref) - 1
-            x1 = self.altitude_ref[-2]
-            x2 = self.altitude_ref[-1]
-        else:
-            for i in range(1, len(self.altitude_ref)):
-                if height < self.altitude_ref[i]:
-                    x_indx_low = i - 1
-                    x_indx_high = i
-                    x1 = self.altitude_ref[i - 1]
-                    x2 = self.altitude_ref[i]
-                    break
-
-        # Mach
-        if mach <= self.mach_ref[0]:
-            y_indx_low = 0
-            y_indx_high = 1
-            y1 = self.mach_ref[0]
-            y2 = self.mach_ref[1]
-        elif mach >= self.mach_ref[-1]:
-            y_indx_low = len(self.mach_ref) - 2
-            y_indx_high = len(self.mach_ref) - 1
-            y1 = self.mach_ref[-2]
-            y2 = self.mach_ref[-1]
-        else:
-            for i in range(1, len(self.mach_ref)):
-                if mach < self.mach_ref[i]:
-                    y_indx_low = i - 1
-                    y_indx_high = i
-                    y1 = self.mach_ref[i - 1]
-                    y2 = self.mach_ref[i]
-                    break
-
-        f11 = self.sfc_input[x_indx_low][y_indx_low]
-        f12 = self.sfc_input[x_indx_low][y_indx_high]
-        f21 = self.sfc_input[x_indx_high][y_indx_low]
-        f22 = self.sfc_input[x_indx_high][y_indx_high]
-
-        sfc = self._weighted_bilinear(x1, x2, y1, y2, f11, f12, f21, f22, height, mach)
-
-        # Now find the max thrust
-        f11 = self.thrust_input[x_indx_low][y_indx_low]
-        f12 = self.thrust_input[x_indx_low][y_indx_high]
-        f21 = self.thrust_input[x_indx_high][y_indx_low]
-        f22 = self.thrust_input[x_indx_high][y_indx_high]
-
-        max_thrust = self._weighted_bilinear(x1, x2, y1, y2, f11, f12, f21, f22, height, mach)
-        max_thrust *= self.n_engines
-
-        # Scale results for partial power (if required thrust is input)
-        if thrust_required:
+        if self._table is None:
+            self._table = _BilinearTable(self._altitude_ref, self._mach_ref, [self._sfc_input, self._thrust_input])
+
+        if _is_scalar(height) and _is_scalar(mach) and _is_scalar(thrust_required):
+            if mach > self._table.y_max:  # TODO edit interpolation to include mach and altitudes outside input list
+                mach = self._table.y_max - .001
+            sfc, max_thrust = self._table.lookup(height, mach)
+            max_thrust *= self.n_engines
+
+            # Scale results for partial power (if required thrust is input)
+            if thrust_required:
+                thrust_percent = thrust_required / max_thrust
+                if thrust_percent > .2:
+                    sfc *= _partial_power_correction(thrust_percent, mach)
+                else:
+                    sfc *= 1.5
+            return sfc, max_thrust
+
+        height, mach = np.broadcast_arrays(np.asarray(height, dtype=float), np.asarray(mach, dtype=float))
+        mach = np.where(mach > self._table.y_max, self._table.y_max - .001, mach)
+        sfc, max_thrust = self._table(height, mach)
+        max_thrust = max_thrust * self.n_engines
+
+        if thrust_required is not None:
+            thrust_required = np.asarray(thrust_required, dtype=float)
             thrust_percent = thrust_required / max_thrust
-            # Raymer partial power correction
-            if thrust_percent > .2:
-                sfc *= .1 / thrust_percent + .24 / (thrust_percent) ** .8 + .66 * thrust_percent ** .8 + .1 * mach * (
-                        1 / thrust_percent - thrust_percent)
-            else:
-                sfc *= 1.5
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correction = np.where(thrust_percent > .2, _partial_power_correction(thrust_percent, mach), 1.5)
+            sfc = np.where(thrust_required != 0, sfc * correction, sfc)
 
         return sfc, max_thrust
 
@@ -240,61 +248,41 @@ class turbofan(engine):
         else:
             sfc_scale_cruise = 1
 
-        # Scale all values
-        for i in range(len(self.thrust_input)):
-            for j in range(len(self.thrust_input[i])):
-                t_scaled_sea_level = self.thrust_input[i][j] * thrust_scale_sl
-                t_scaled_cruise = self.thrust_input[i][j] * thrust_scale_cruise
-                sfc_scaled_sl = self.sfc_input[i][j] * sfc_scale_sl
-                sfc_scaled_cruise = self.sfc_input[i][j] * sfc_scale_cruise
-
-                if thrust_sea_level and not thrust_cruise:
-                    self.thrust_input[i][j] = t_scaled_sea_level
-                elif thrust_cruise and not thrust_sea_level:
-                    self.thrust_input[i][j] = t_scaled_cruise
-                elif thrust_cruise and thrust_sea_level:
-                    self.thrust_input[i][j] = (h_cruise - self.altitude_ref[i]) / h_cruise * t_scaled_sea_level + \
-                                              self.altitude_ref[i] / h_cruise * t_scaled_cruise
-
-                if sfc_sea_level and not sfc_cruise:
-                    self.sfc_input[i][j] = sfc_scaled_sl
-                elif sfc_cruise and not sfc_sea_level:
-                    self.sfc_input[i][j] = sfc_scaled_cruise
-                elif sfc_cruise and sfc_sea_level:
-                    self.sfc_input[i][j] = (h_cruise - self.altitude_ref[i]) / h_cruise * sfc_scaled_sl + \
-                                           self.altitude_ref[i] / h_cruise * sfc_scaled_cruise
-
-        self.max_thrust = self.thrust_input[0][0]
+        # Scale all values, blending linearly from the sea level to the cruise scaling with altitude if both are given
+        altitude = self.altitude_ref[:, None]
+        if thrust_sea_level and not thrust_cruise:
+            self.thrust_input = self.thrust_input * thrust_scale_sl
+        elif thrust_cruise and not thrust_sea_level:
+            self.thrust_input = self.thrust_input * thrust_scale_cruise
+        elif thrust_cruise and thrust_sea_level:
+            self.thrust_input = (h_cruise - altitude) / h_cruise * (self.thrust_input * thrust_scale_sl) + \
+                                altitude / h_cruise * (self.thrust_input * thrust_scale_cruise)
+
+        if sfc_sea_level and not sfc_cruise:
+            self.sfc_input = self.sfc_input * sfc_scale_sl
+        elif sfc_cruise and not sfc_sea_level:
+            self.sfc_input = self.sfc_input * sfc_scale_cruise
+        elif sfc_cruise and sfc_sea_level:
+            self.sfc_input = (h_cruise - altitude) / h_cruise * (self.sfc_input * sfc_scale_sl) + \
+                             altitude / h_cruise * (self.sfc_input * sfc_scale_cruise)
+
+        self.max_thrust = float(self.thrust_input[0][0])
 
-    @staticmethod
-    def _weighted_bilinear(x1, x2, y1, y2, f11, f12, f21, f22, x, y):
+    def write_data_file(self, file_name):
         """
-        Performs weighted bilinear interpolation for a given set of points.
-
-        :param float x1: Lower bound for the x-coordinate.
-        :param float x2: Upper bound for the x-coordinate.
-        :param float y1: Lower bound for the y-coordinate.
-        :param float y2: Upper bound for the y-coordinate.
-        :param float f11: Value at (x1, y1).
-        :param float f12: Value at (x1, y2).
-        :param float f21: Value at (x2, y1).
-        :param float f22: Value at (x2, y2).
-        :param float x: Target x-coordinate for interpolation.
-        :param float y: Target y-coordinate for interpolation.
-
-        :return: Interpolated value at (x, y).
-        :rtype: float
+        Writes the engine deck to an Excel file, or to a binary deck if file_name ends in .npy
+
+        :param str file_name: data file path
         """
-        # Weighted Bilinear interpolation
-        w11 = ((x2 - x) * (y2 - y)) / ((x2 - x1) * (y2 - y1))
-        w12 = ((x2 - x) * (y - y1)) / ((x2 - x1) * (y2 - y1))
-        w21 = ((x - x1) * (y2 - y)) / ((x2 - x1) * (y2 - y1))
-        w22 = ((x - x1) * (y - y1)) / ((x2 - x1) * (y2 - y1))
+        if file_name.lower().endswith('.npy'):
+            np.save(file_name, _pack_deck(self.altitude_ref, self.mach_ref, self.thrust_input, self.sfc_input))
+            return
 
-        f = w11 * f11 + w12 * f12 + w21 * f21 + w22 * f22
-        return f
+        # Excel support is only imported when it's used, pandas and openpyxl are slow to import
+        import pandas as pd
+        from openpyxl import load_workbook
+        from openpyxl.styles import Font, Alignment
 
-    def write_data_file(self, file_name):
         # Output data file to correct location
         thrust_df = pd.DataFrame(self.thrust_input, columns=self.mach_ref, index=self.altitude_ref)
         sfc_df = pd.DataFrame(self.sfc_input, columns=self.mach_ref, index=self.altitude_ref)
@@ -338,13 +326,204 @@ class turbofan(engine):
             wb.save(file_name)
 
     def load_data_file(self, file_name):
-        thrust_df = pd.read_excel(file_name, sheet_name="Thrust", skiprows=2, header=0, index_col=0)
-        sfc_df = pd.read_excel(file_name, sheet_name="sfc", skiprows=2, header=0, index_col=0)
+        """
+        Loads the engine deck from an Excel file written by write_data_file, or from a binary .npy deck
+
+        Excel decks are only parsed the first time they're loaded, see read_engine_deck. The tables are read only
+        copies of the loaded deck.
+
+        :param str file_name: data file path
+        """
+        deck = read_engine_deck(file_name)
+        self.altitude_ref = deck[0, 1:, 0]
+        self.mach_ref = deck[0, 0, 1:]
+        self.thrust_input = deck[0, 1:, 1:]
+        self.sfc_input = deck[1, 1:, 1:]
+
+
+# Loaded engine decks by absolute path, with the modification time and size of the file they were loaded from
+_engine_decks = {}
+
+# Directory binary copies of Excel engine decks are cached in, see read_engine_deck. Set to None to only keep converted
+# decks in memory.
+ENGINE_DECK_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                 'WUADS', 'engine_decks')
+
+
+def read_engine_deck(file_name):
+    """
+    Reads an engine deck, either an Excel file written by turbofan.write_data_file or a binary .npy deck
+
+    The binary deck is a single array of shape (2, n_altitudes + 1, n_machs + 1) holding the thrust (lbs) and sfc
+    tables, each with the mach numbers in its first row and the altitudes (ft) in its first column. It's memory mapped
+    rather than read.
+
+    Excel decks are converted to a binary deck in ENGINE_DECK_CACHE the first time they're read, and the binary deck is
+    used for as long as it's newer than the Excel file, nothing is written next to the Excel file. Use
+    convert_engine_deck to keep a binary deck alongside the data. Decks are also kept in memory, and are only reloaded
+    when their file changes.
 
-        self.altitude_ref = thrust_df.index.to_list()
-        self.mach_ref = thrust_df.columns.tolist()
-        self.thrust_input = thrust_df.values.tolist()
-        self.sfc_input = sfc_df.values.tolist()
+    :param str file_name: engine deck path
+
+    :return: read only deck array
+    """
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if path in _engine_decks and _engine_decks[path][0] == key:
+        return _engine_decks[path][1]
+
+    if path.lower().endswith('.npy'):
+        deck = np.load(path, mmap_mode='r')
+    else:
+        binary_file = _cached_deck_file(path)
+        if binary_file and os.path.exists(binary_file) and os.stat(binary_file).st_mtime_ns >= stat.st_mtime_ns:
+            deck = np.load(binary_file, mmap_mode='r')
+        else:
+            logger.info(f'Converting engine deck {file_name}')
+            deck = _read_excel_deck(path)
+            try:
+                if not binary_file:
+                    raise OSError('engine deck cache is disabled')
+                os.makedirs(ENGINE_DECK_CACHE, exist_ok=True)
+                _save_atomic(binary_file, deck)
+                deck = np.load(binary_file, mmap_mode='r')
+            except OSError as e:
+                # Without a cache the parsed deck is still kept in memory
+                logger.debug(f'Could not save binary engine deck {binary_file}: {e}')
+                deck.flags.writeable = False
+
+    if deck.ndim != 3 or deck.shape[0] != 2:
+        raise ValueError(f'{file_name} is not an engine deck')
+    _engine_decks[path] = (key, deck)
+    return deck
+
+
+def _cached_deck_file(path):
+    """ Binary deck in the cache for the Excel deck at path, None if the cache is disabled """
+    if not ENGINE_DECK_CACHE:
+        return None
+    digest = hashlib.sha256(path.encode()).hexdigest()[:16]
+    return os.path.join(ENGINE_DECK_CACHE, f'{os.path.splitext(os.path.basename(path))[0]}-{digest}.npy')
+
+
+def convert_engine_deck(data_file, deck_file=None):
+    """
+    Converts an Excel engine deck written by turbofan.write_data_file to a binary .npy deck
+
+    :param str data_file: Excel deck path
+    :param str deck_file: binary deck path, defaults to data_file with a .npy extension
+
+    :return: binary deck path
+    """
+    if deck_file is None:
+        deck_file = os.path.splitext(data_file)[0] + '.npy'
+    _save_atomic(deck_file, _read_excel_deck(data_file))
+    return deck_file
+
+
+def _read_excel_deck(file_name):
+    import pandas as pd
+
+    thrust_df = pd.read_excel(file_name, sheet_name="Thrust", skiprows=2, header=0, index_col=0)
+    sfc_df = pd.read_excel(file_name, sheet_name="sfc", skiprows=2, header=0, index_col=0)
+    return _pack_deck(thrust_df.index.to_list(), thrust_df.columns.tolist(), thrust_df.values, sfc_df.values)
+
+
+def _pack_deck(altitudes, machs, thrust, sfc):
+    """ Stacks the thrust and sfc tables with their altitude and mach number headers into a single deck array """
+    altitudes = np.asarray(altitudes, dtype=float)
+    machs = np.asarray(machs, dtype=float)
+    deck = np.zeros((2, len(altitudes) + 1, len(machs) + 1))
+    deck[:, 0, 1:] = machs
+    deck[:, 1:, 0] = altitudes
+    deck[0, 1:, 1:] = thrust
+    deck[1, 1:, 1:] = sfc
+    return deck
+
+
+def _save_atomic(file_name, array):
+    """ Saves an array through a temporary file, so other processes never load a partly written deck """
+    tmp_file = f'{file_name}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_file, 'wb') as fid:
+            np.save(fid, array)
+        os.replace(tmp_file, file_name)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _partial_power_correction(thrust_percent, mach):
+    """ Raymer partial power correction factor for the sfc at a fraction of the maximum thrust, above 20% thrust """
+    return .1 / thrust_percent + .24 / (thrust_percent) ** .8 + .66 * thrust_percent ** .8 + .1 * mach * (
+            1 / thrust_percent - thrust_percent)
+
+
+def _read_only(x):
+    """ Copy of x as a float array that can't be edited in place """
+    x = np.array(x, dtype=float)
+    x.flags.writeable = False
+    return x
+
+
+def _is_scalar(x):
+    return x is None or isinstance(x, (int, float, np.number))
+
+
+class _BilinearTable:
+    """
+    Bilinear interpolation of one or more tables on a rectangular grid, extrapolating linearly from the edge cells
+
+    The grid and tables are stored once when the table is built. Single points are looked up in plain python, which
+    is much cheaper than numpy for one value, and arrays are evaluated in one vectorized call.
+    """
+
+    def __init__(self, x, y, tables):
+        """
+        :param x: grid values along the first axis, ascending
+        :param y: grid values along the second axis, ascending
+        :param tables: list of tables, each of shape (len(x), len(y))
+        """
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.values = np.stack([np.asarray(table, dtype=float) for table in tables])
+        self._x = self.x.tolist()
+        self._y = self.y.tolist()
+        self._values = self.values.tolist()
+        self.y_max = self._y[-1]
+
+    def lookup(self, x, y):
+        """ Interpolated value of each table at a single point """
+        i = min(max(bisect.bisect_right(self._x, x) - 1, 0), len(self._x) - 2)
+        j = min(max(bisect.bisect_right(self._y, y) - 1, 0), len(self._y) - 2)
+        x1, x2 = self._x[i], self._x[i + 1]
+        y1, y2 = self._y[j], self._y[j + 1]
+
+        # Weighted Bilinear interpolation
+        area = (x2 - x1) * (y2 - y1)
+        w11 = ((x2 - x) * (y2 - y)) / area
+        w12 = ((x2 - x) * (y - y1)) / area
+        w21 = ((x - x1) * (y2 - y)) / area
+        w22 = ((x - x1) * (y - y1)) / area
+        return [w11 * f[i][j] + w12 * f[i][j + 1] + w21 * f[i + 1][j] + w22 * f[i + 1][j + 1] for f in self._values]
+
+    def __call__(self, x, y):
+        """ Interpolated value of each table at arrays of points """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        i = np.clip(np.searchsorted(self.x, x, side='right') - 1, 0, len(self.x) - 2)
+        j = np.clip(np.searchsorted(self.y, y, side='right') - 1, 0, len(self.y) - 2)
+        x1, x2 = self.x[i], self.x[i + 1]
+        y1, y2 = self.y[j], self.y[j + 1]
+
+        area = (x2 - x1) * (y2 - y1)
+        w11 = ((x2 - x) * (y2 - y)) / area
+        w12 = ((x2 - x) * (y - y1)) / area
+        w21 = ((x - x1) * (y2 - y)) / area
+        w22 = ((x - x1) * (y - y1)) / area
+        f = self.values
+        return [w11 * f[k, i, j] + w12 * f[k, i, j + 1] + w21 * f[k, i + 1, j] + w22 * f[k, i + 1, j + 1]
+                for k in range(len(f))]
 
 
 class propeller(engine):
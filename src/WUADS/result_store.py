@@ -0,0 +1,287 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Tables of a result store and their columns. Each analyzed aircraft is one row of runs, every other table refers to
+# it by its run number.
+SCHEMA = {
+    'runs': [('run', 'INTEGER PRIMARY KEY'), ('sample', 'INTEGER'), ('title', 'TEXT'),
+             ('weight_takeoff', 'REAL'), ('weight_empty', 'REAL'), ('weight_max', 'REAL'), ('w_fuel', 'REAL'),
+             ('w_cargo', 'REAL'), ('w_passengers', 'REAL'),
+             ('cg_x', 'REAL'), ('cg_y', 'REAL'), ('cg_z', 'REAL'),
+             ('cg_empty_x', 'REAL'), ('cg_empty_y', 'REAL'), ('cg_empty_z', 'REAL'),
+             ('sref', 'REAL'), ('cd0', 'REAL'), ('cdw', 'REAL'), ('range', 'REAL'), ('error', 'TEXT')],
+    # Design variables, or any other inputs the run was made with
+    'inputs': [('run', 'INTEGER'), ('name', 'TEXT'), ('value', 'REAL')],
+    # Aero components with their share of the drag at cruise, subsystems and miscellaneous weights
+    'components': [('run', 'INTEGER'), ('name', 'TEXT'), ('category', 'TEXT'), ('weight', 'REAL'),
+                   ('cg_x', 'REAL'), ('cg_y', 'REAL'), ('cg_z', 'REAL'), ('cd0', 'REAL'), ('cdw', 'REAL')],
+    # Mission segments in the order they're flown
+    'segments': [('run', 'INTEGER'), ('position', 'INTEGER'), ('title', 'TEXT'), ('segment_type', 'TEXT'),
+                 ('range', 'REAL'), ('fuel_burnt', 'REAL'), ('wi', 'REAL'), ('wn', 'REAL'),
+                 ('weight_fraction', 'REAL'), ('lift_to_drag', 'REAL'), ('sfc', 'REAL'), ('cl', 'REAL'),
+                 ('cd', 'REAL'), ('cd0', 'REAL'), ('cdw', 'REAL'), ('mach', 'REAL'), ('altitude', 'REAL'),
+                 ('time', 'REAL')]
+}
+
+SEGMENT_OUTPUTS = [name for name, _ in SCHEMA['segments'][4:]]
+
+
+def aircraft_record(aircraft, inputs=None, segments=True):
+    """
+    Record of an analyzed aircraft for ResultStore.append, made of plain values so it can be sent between processes
+
+    :param aircraft: aircraft to record, its mission should have been run if segments is set
+    :param dict inputs: value of each input, e.g. design variables, by name
+    :param bool segments: record the mission segments
+
+    :return: dict with the 'run' row, 'inputs', and the 'components' and 'segments' rows
+    """
+    run = {'title': aircraft.title,
+           'weight_takeoff': aircraft.weight_takeoff,
+           'weight_empty': aircraft.weight_empty,
+           'weight_max': aircraft.weight_max,
+           'w_fuel': aircraft.w_fuel,
+           'w_cargo': aircraft.w_cargo,
+           'w_passengers': aircraft.useful_load.w_passengers,
+           'sref': aircraft.sref,
+           'cd0': aircraft.cd0,
+           'cdw': aircraft.cdw,
+           'range': aircraft.mission.range if segments else None}
+    run.update(zip(['cg_x', 'cg_y', 'cg_z'], aircraft.cg))
+    run.update(zip(['cg_empty_x', 'cg_empty_y', 'cg_empty_z'], aircraft.cg_empty))
+
+    components = []
+    component_drag = aircraft.component_drag
+    for title, comp in aircraft.aero_components.items():
+        cd0, cdw = component_drag.get(title, (None, None))
+        components.append(_component_row(comp, 'aero', cd0, cdw))
+    for comp in aircraft.subsystems.components.values():
+        components.append(_component_row(comp, 'subsystem'))
+    for comp in aircraft.misc_components.values():
+        components.append(_component_row(comp, 'misc'))
+
+    rows = []
+    if segments:
+        for i, seg in enumerate(aircraft.mission.mission_profile):
+            row = {'position': i, 'title': seg.title, 'segment_type': seg.segment_type}
+            row.update({name: _real(getattr(seg, name, None)) for name in SEGMENT_OUTPUTS})
+            rows.append(row)
+
+    return {'run': {name: value if isinstance(value, str) else _real(value) for name, value in run.items()},
+            'inputs': {name: _real(value) for name, value in (inputs or {}).items()},
+            'components': components,
+            'segments': rows}
+
+
+def _component_row(comp, category, cd0=None, cdw=None):
+    row = {'name': comp.title, 'category': category, 'weight': _real(comp.weight), 'cd0': _real(cd0),
+           'cdw': _real(cdw)}
+    row.update(zip(['cg_x', 'cg_y', 'cg_z'], (_real(x) for x in comp.cg)))
+    return row
+
+
+def _real(value):
+    """ value as a float, None if it's missing or not a number """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+class ResultStore:
+    """
+    SQLite file of analysis results with a fixed schema, for sweeps over thousands of aircraft
+
+    Each run records its inputs, the weight and cg of every component, the parasite and wave drag of each aero
+    component, and the range, fuel burnt, L/D and sfc of each mission segment, see SCHEMA. Records are buffered and
+    written buffer_size at a time in a single transaction, flush or close writes the rest. Results are read back with
+    SQL, a row at a time or as pandas dataframes in chunks, so the whole file is never loaded.
+
+    It can also be given to doe.run_doe as the output file, in which case each sample is stored with its full record.
+    Design of experiments records aren't buffered, each write is committed straight away, so a design that's
+    interrupted, even by the process being killed, resumes from every sample that completed.
+
+    Usage:
+        with ResultStore('sweep.sqlite') as store:
+            for span in spans:
+                ac.update_component(('Main Wing', 'span', span))
+                ac.mission.run_case()
+                store.add(ac, inputs={'span': span})
+        heaviest = store.dataframe("SELECT run, name, weight FROM components WHERE category = 'aero' "
+                                   "ORDER BY weight DESC LIMIT 10")
+    """
+
+    aircraft_records = True  # doe.run_doe passes the aircraft_record of each sample to write
+
+    def __init__(self, db_file, buffer_size=1000):
+        """
+        :param str db_file: SQLite file, added to if it already exists
+        :param int buffer_size: number of runs held in memory before they're written
+        """
+        self.db_file = os.path.abspath(db_file)
+        self.buffer_size = buffer_size
+        self.columns = None  # Design of experiments columns, see open
+
+        self._buffer = []
+        self._next_run = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, aircraft, inputs=None, segments=True):
+        """
+        Records an analyzed aircraft, see aircraft_record
+
+        :return: run number of the record
+        """
+        return self.append(aircraft_record(aircraft, inputs=inputs, segments=segments))
+
+    def append(self, record):
+        """
+        Buffers a record from aircraft_record, writing the buffer once it's full
+
+        :return: run number of the record
+        """
+        with self._lock:
+            if self._next_run is None:
+                self._next_run = self._db().execute('SELECT COALESCE(MAX(run), 0) + 1 FROM runs').fetchone()[0]
+            run = self._next_run
+            self._next_run += 1
+            self._buffer.append((run, record))
+            if len(self._buffer) >= self.buffer_size:
+                self._write_buffer()
+        return run
+
+    def flush(self):
+        """ Writes the buffered records """
+        with self._lock:
+            self._write_buffer()
+
+    def query(self, sql, params=()):
+        """
+        Runs an SQL query on the stored results, buffered records are written first
+
+        :return: iterator over the result rows, each a dict by column name
+        """
+        self.flush()
+        cursor = self._db().execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        for row in cursor:
+            yield dict(zip(names, row))
+
+    def dataframe(self, sql, params=(), chunksize=None):
+        """
+        Runs an SQL query on the stored results into a pandas dataframe
+
+        :param int chunksize: rows per dataframe, if set an iterator over the dataframes is returned
+        """
+        import pandas as pd
+        self.flush()
+        return pd.read_sql_query(sql, self._db(), params=params, chunksize=chunksize)
+
+    def open(self, columns):
+        """
+        Starts storing a design of experiments, see doe.run_doe
+
+        :param list columns: design of experiments columns, the sample index, design variables, outputs and error
+        :return: completed samples already in the file, as a dict of records by sample index
+        """
+        self.columns = list(columns)
+        variables = self._variables()
+        runs = {}
+        outputs = [name for name in self.columns[1:] if name not in variables]
+        for row in self._db().execute(f'SELECT run, sample, {", ".join(outputs)} FROM runs '
+                                      f'WHERE sample IS NOT NULL ORDER BY run'):
+            record = {self.columns[0]: row[1]}
+            record.update({name: math.nan if value is None else value for name, value in zip(outputs, row[2:])})
+            if 'error' in record:
+                record['error'] = record['error'] if isinstance(record['error'], str) else ''
+            runs[row[0]] = record
+        for run, name, value in self._db().execute('SELECT run, name, value FROM inputs WHERE run IN '
+                                                   '(SELECT run FROM runs WHERE sample IS NOT NULL)'):
+            runs[run][name] = value
+
+        completed = {}
+        for record in runs.values():
+            names = sorted(set(record) - set(outputs) - {self.columns[0]})
+            if names != sorted(variables):
+                raise ValueError(f'{self.db_file} has inputs {names}, expected {variables}')
+            completed[record[self.columns[0]]] = record
+        return completed
+
+    def write(self, records):
+        """
+        Stores design of experiments records, with the aircraft_record of the sample under 'aircraft' if it ran, and
+        commits them along with anything buffered
+        """
+        variables = self._variables()
+        for record in records:
+            stored = record.get('aircraft') or {'run': {}, 'components': [], 'segments': []}
+            run = dict(stored['run'])
+            run.update({name: value for name, value in record.items() if name not in variables and name != 'aircraft'})
+            run['sample'] = run.pop(self.columns[0])
+            run['error'] = record.get('error') or None
+            self.append({'run': {name: value if isinstance(value, str) or value is None else _real(value)
+                                 for name, value in run.items()},
+                         'inputs': {name: record[name] for name in variables},
+                         'components': stored['components'],
+                         'segments': stored['segments']})
+        self.flush()
+
+    def close(self):
+        """ Writes the buffered records and closes the database connection """
+        with self._lock:
+            self._write_buffer()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+                self._next_run = None
+
+    def _variables(self):
+        """ Design variable columns of the design of experiments """
+        run_columns = {name for name, _ in SCHEMA['runs']}
+        return [name for name in self.columns[1:] if name not in run_columns]
+
+    def _write_buffer(self):
+        if not self._buffer:
+            return
+        rows = {table: [] for table in SCHEMA}
+        for run, record in self._buffer:
+            rows['runs'].append({**record['run'], 'run': run})
+            rows['inputs'].extend({'run': run, 'name': name, 'value': value}
+                                  for name, value in record['inputs'].items())
+            rows['components'].extend({**row, 'run': run} for row in record['components'])
+            rows['segments'].extend({**row, 'run': run} for row in record['segments'])
+
+        db = self._db()
+        with db:
+            for table, table_rows in rows.items():
+                names = [name for name, _ in SCHEMA[table]]
+                db.executemany(f'INSERT INTO {table} ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+                               [[row.get(name) for name in names] for row in table_rows])
+        logger.debug(f'Wrote {len(self._buffer)} runs to {self.db_file}')
+        self._buffer.clear()
+
+    def _db(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._connection = sqlite3.connect(self.db_file, check_same_thread=False)
+            with self._connection as db:
+                for table, columns in SCHEMA.items():
+                    db.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                               f'({", ".join(f"{name} {kind}" for name, kind in columns)})')
+                    if table != 'runs':
+                        db.execute(f'CREATE INDEX IF NOT EXISTS {table}_run ON {table} (run)')
+                db.execute('CREATE INDEX IF NOT EXISTS runs_sample ON runs (sample)')
+        return self._connection
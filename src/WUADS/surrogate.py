@@ -0,0 +1,200 @@
+import logging
+import numpy as np
+
+from .avl_run import avl_coefficients, avl_coefficients_batch
+from .flight_conditions import FlightConditions
+
+logger = logging.getLogger(__name__)
+
+
+class AeroSurrogate:
+    """
+    Radial basis function model of the aircraft's AVL results, for optimization loops which would otherwise run AVL
+    thousands of times on nearby geometries
+
+    The model is trained on AVL runs over a design box of main wing area, span, and quarter chord sweep, and of mach
+    number and lift coefficient, and predicts the induced (plus trim) drag coefficient and angle of attack. The rest of
+    the aircraft is held at its geometry when the surrogate was trained.
+
+    Predictions outside the design box, or while the cross validation error is above max_error, are passed on to AVL,
+    as are cases at a fixed angle of attack.
+
+    Usage:
+        ac.aero_surrogate = AeroSurrogate(AeroSurrogate.default_bounds(ac))
+        ac.aero_surrogate.train(ac)
+        ac.aero_surrogate.save('surrogate.npz')
+        ac.aero_backend = 'surrogate'
+        ac.mission.run_case()
+    """
+
+    variables = ['area', 'span', 'sweep', 'mach', 'cl']
+    outputs = ['cdi', 'aoa']
+
+    def __init__(self, bounds, kernel='thin_plate_spline', smoothing=0., max_error=None):
+        """
+        :param dict bounds: (lower, upper) limits of the design box for each of the variables, wing area (ft^2), span
+                            (ft), quarter chord sweep (deg), mach number and lift coefficient
+        :param str kernel: RBFInterpolator kernel
+        :param float smoothing: RBFInterpolator smoothing, 0 interpolates the training data exactly
+        :param float max_error: largest acceptable cross validation error in the induced drag coefficient, the
+                                surrogate isn't used if its error is larger
+        """
+        self.bounds = np.array([bounds[var] for var in self.variables], dtype=float)
+        self.kernel = kernel
+        self.smoothing = smoothing
+        self.max_error = max_error
+
+        self.x = None  # Training inputs
+        self.y = None  # Training outputs, induced drag coefficient and angle of attack (deg)
+        self.error = None  # Cross validation RMS error of each output
+        self.n_predictions = 0  # Cases served by the surrogate
+        self.n_fallbacks = 0  # Cases passed on to AVL
+
+        self._model = None
+
+    @classmethod
+    def default_bounds(cls, aircraft, margin=.15):
+        """
+        Design box around the aircraft's current main wing and cruise condition
+
+        :param aircraft: aircraft to base the box on
+        :param float margin: fractional variation of the wing area and span
+        """
+        wing = aircraft.aero_components['Main Wing']
+        return {'area': (wing.area * (1 - margin), wing.area * (1 + margin)),
+                'span': (wing.span * (1 - margin), wing.span * (1 + margin)),
+                'sweep': (max(wing.sweep_deg - 5, 0), wing.sweep_deg + 5),
+                'mach': (.2, min(aircraft.mach_cruise + .05, .9)),
+                'cl': (.1, 1.2)}
+
+    def train(self, aircraft, n_geometries=20, n_conditions=8, seed=None):
+        """
+        Runs AVL over the design box and fits the model
+
+        Wing geometries and flight conditions are each sampled with a latin hypercube, and all the flight conditions of
+        a geometry are run in a single AVL process. The aircraft itself is not modified.
+
+        :param aircraft: aircraft to train on
+        :param int n_geometries: number of wing geometries
+        :param int n_conditions: number of mach number and lift coefficient cases for each geometry
+        :param int seed: random seed for the sampling
+        """
+        from scipy.stats import qmc
+
+        rng = np.random.default_rng(seed)
+        geometries = qmc.scale(qmc.LatinHypercube(d=3, seed=rng).random(n_geometries),
+                               self.bounds[:3, 0], self.bounds[:3, 1])
+
+        # Work on a copy, a running AVL session is shared rather than copied
+        sample = aircraft.clone()
+        wing = sample.aero_components['Main Wing']
+        if 'cr' in wing.params:
+            # Wings defined by root and tip chord are converted to area and taper by their first area update
+            sample.update_component(('Main Wing', 'area', wing.area))
+
+        x, y = [], []
+        for i, (area, span, sweep) in enumerate(geometries):
+            logger.info(f'Training aero surrogate, geometry {i + 1} of {n_geometries}')
+            sample.update_component([('Main Wing', 'area', area),
+                                     ('Main Wing', 'span', span),
+                                     ('Main Wing', 'sweep', sweep)], maintain_aspect_ratio=False)
+
+            conditions = qmc.scale(qmc.LatinHypercube(d=2, seed=rng).random(n_conditions),
+                                   self.bounds[3:, 0], self.bounds[3:, 1])
+            cases = []
+            for mach, cl in conditions:
+                fc = FlightConditions(sample.h_cruise, mach)
+                cases.append({'fc': fc, 'w': cl * fc.q * sample.sref, 'mach': mach, 'cd0': 0, 'cdw': 0})
+
+            for (mach, cl), (cl_avl, cd, aoa) in zip(conditions, avl_coefficients_batch(sample, cases)):
+                x.append([area, span, sweep, mach, cl_avl])
+                y.append([cd, aoa])
+
+        self.fit(np.array(x), np.array(y))
+
+    def fit(self, x, y, n_folds=10):
+        """
+        Fits the model to training data and estimates its error by k-fold cross validation
+
+        :param x: inputs, one row per sample in the order of self.variables
+        :param y: outputs, one row per sample in the order of self.outputs
+        :param int n_folds: number of cross validation folds
+        """
+        from scipy.interpolate import RBFInterpolator
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        x_norm = self._normalize(self.x)
+
+        folds = np.array_split(np.random.default_rng(0).permutation(len(self.x)), min(n_folds, len(self.x)))
+        residuals = np.zeros_like(self.y)
+        for fold in folds:
+            train = np.setdiff1d(np.arange(len(self.x)), fold)
+            model = RBFInterpolator(x_norm[train], self.y[train], kernel=self.kernel, smoothing=self.smoothing)
+            residuals[fold] = model(x_norm[fold]) - self.y[fold]
+        self.error = np.sqrt(np.mean(residuals ** 2, axis=0))
+
+        self._model = RBFInterpolator(x_norm, self.y, kernel=self.kernel, smoothing=self.smoothing)
+        logger.info(f'Aero surrogate fit to {len(self.x)} samples, cross validation error: '
+                    f'cdi {self.error[0]:.2e}, aoa {self.error[1]:.2e} deg')
+
+    def predict(self, x):
+        """
+        Predicts the induced drag coefficient and angle of attack
+
+        :param x: inputs, one row per case in the order of self.variables
+
+        :return: predictions with one row per case, and the cross validation error of each output
+        """
+        return self._model(self._normalize(np.atleast_2d(x))), self.error
+
+    def in_bounds(self, x):
+        """ True for each case inside the design box """
+        x = np.atleast_2d(x)
+        return np.all((x >= self.bounds[:, 0]) & (x <= self.bounds[:, 1]), axis=1)
+
+    @property
+    def trusted(self):
+        return self._model is not None and (self.max_error is None or self.error[0] <= self.max_error)
+
+    def coefficients(self, ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+        """
+        Surrogate replacement for avl_run.get_coefficients, falls back to AVL outside of the design box
+
+        :return: lift coefficient, drag coefficient, and angle of attack (deg)
+        """
+        if cd0 is None:
+            cd0 = ac.cd0
+        if cdw is None:
+            cdw = ac.cdw
+
+        wing = ac.aero_components['Main Wing']
+        cl = w / (fc.q * ac.sref)
+        x = [wing.area, wing.span, wing.sweep_deg, fc.mach, cl]
+        if aoa is not None or not self.trusted or not self.in_bounds(x)[0]:
+            self.n_fallbacks += 1
+            return avl_coefficients(ac, fc, w, mach=mach, cd0=cd0, cdw=cdw, aoa=aoa)
+
+        self.n_predictions += 1
+        (cdi, alpha), = self.predict(x)[0]
+        return cl, cd0 + cdw + cdi, alpha
+
+    def save(self, file_name):
+        """ Saves the design box and training data, the model is refit from them when loaded """
+        np.savez(file_name, variables=self.variables, bounds=self.bounds, x=self.x, y=self.y, kernel=self.kernel,
+                 smoothing=self.smoothing, max_error=np.nan if self.max_error is None else self.max_error)
+
+    @classmethod
+    def load(cls, file_name):
+        """ Loads a surrogate saved with save """
+        with np.load(file_name) as data:
+            if list(data['variables']) != cls.variables:
+                raise ValueError(f'{file_name} was saved with different surrogate variables')
+            max_error = float(data['max_error'])
+            surrogate = cls(dict(zip(cls.variables, data['bounds'])), kernel=str(data['kernel']),
+                            smoothing=float(data['smoothing']), max_error=None if np.isnan(max_error) else max_error)
+            surrogate.fit(data['x'], data['y'])
+        return surrogate
+
+    def _normalize(self, x):
+        return (x - self.bounds[:, 0]) / (self.bounds[:, 1] - self.bounds[:, 0])
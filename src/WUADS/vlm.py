@@ -0,0 +1,310 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VortexLattice:
+    """
+    Horseshoe vortex lattice model of the aircraft's lifting surfaces
+
+    Uses the same avl_sections, wing incidence and elevator definitions that are written to the AVL geometry file, so
+    it can stand in for AVL when the binary isn't available. Surfaces are mirrored about the aircraft centerline and
+    only symmetric flight is modelled, vertical surfaces carry no load in symmetric flight and are left out.
+    Airfoil camber is not modelled.
+
+    The influence matrix only depends on the geometry, it's factored once when the model is built and every solve
+    after that is a back substitution. Compressibility is accounted for with the Prandtl-Glauert correction.
+    """
+
+    def __init__(self, aircraft, n_chordwise=8, n_spanwise=30):
+        """
+        Builds the panel layout and factors the influence matrix
+
+        :param object aircraft: aircraft to model
+        :param int n_chordwise: number of chordwise panels on each surface
+        :param int n_spanwise: number of spanwise strips on each half surface
+        """
+        self.n_chordwise = n_chordwise
+        self.n_spanwise = n_spanwise
+
+        self.sref = aircraft.sref  # Reference area (ft^2)
+        self.cref = aircraft.aero_components['Main Wing'].cref  # Reference chord (ft)
+        self.bref = aircraft.aero_components['Main Wing'].span  # Reference span (ft)
+
+        self._build_panels(aircraft)
+        self._factor()
+
+    def _build_panels(self, aircraft):
+        """ Splits the right half of each lifting surface into strips and chordwise panels """
+        # Cosine spacing chordwise, panels are clustered at the leading and trailing edge
+        x_c = .5 * (1 - np.cos(np.linspace(0, np.pi, self.n_chordwise + 1)))
+        x_bound = x_c[:-1] + .25 * np.diff(x_c)  # Bound vortex at the panel quarter chord
+        x_control = x_c[:-1] + .75 * np.diff(x_c)  # Control point at the panel three quarter chord
+        x_mid = .5 * (x_c[:-1] + x_c[1:])
+
+        bound_a, bound_b, control, normal, d_normal = [], [], [], [], []
+        trefftz_a, trefftz_b = [], []
+
+        # Same surfaces, in the same order, as AVL_input
+        components = [aircraft.aero_components['Main Wing']]
+        components += [comp for title, comp in aircraft.aero_components.items() if title != 'Main Wing']
+        for comp in components:
+            if not comp.aero_body or 'vertical' in comp.component_type.lower():
+                continue
+
+            sections = np.array([sec[:5] for sec in comp.avl_sections], dtype=float)
+            incidence = np.deg2rad(sections[:, 4] + (2 if 'wing' in comp.component_type.lower() else 0))
+            hinge = comp.control_surface_ratio if 'horizontal' in comp.component_type.casefold() else None
+
+            # Spread the strips over the sections by their length in the y-z plane
+            lengths = np.hypot(np.diff(sections[:, 1]), np.diff(sections[:, 2]))
+            n_strips = np.maximum(1, np.round(self.n_spanwise * lengths / lengths.sum()).astype(int))
+
+            for i in range(len(sections) - 1):
+                eta = np.linspace(0, 1, n_strips[i] + 1)
+                le = sections[i, :3] + np.outer(eta, sections[i + 1, :3] - sections[i, :3])
+                chord = sections[i, 3] + eta * (sections[i + 1, 3] - sections[i, 3])
+                ainc = incidence[i] + eta * (incidence[i + 1] - incidence[i])
+                chord_dir = np.column_stack([np.cos(ainc), np.zeros_like(ainc), -np.sin(ainc)])
+
+                # Points along each strip edge at a given fraction of the chord
+                def edge(x):
+                    return le[:, None, :] + (chord[:, None] * x[None, :])[:, :, None] * chord_dir[:, None, :]
+
+                bound = edge(x_bound)
+                ctrl = edge(x_control)
+                mid = edge(x_mid)
+                te = edge(np.array([1.]))[:, 0, :]
+
+                bound_a.append(bound[:-1].reshape(-1, 3))
+                bound_b.append(bound[1:].reshape(-1, 3))
+                control.append((.5 * (ctrl[:-1] + ctrl[1:])).reshape(-1, 3))
+
+                # Panel normal from the chordwise and spanwise directions
+                span_dir = mid[1:] - mid[:-1]
+                chordwise = np.broadcast_to((.5 * (chord_dir[:-1] + chord_dir[1:]))[:, None, :], span_dir.shape)
+                n = np.cross(chordwise, span_dir)
+                n /= np.linalg.norm(n, axis=2, keepdims=True)
+                normal.append(n.reshape(-1, 3))
+
+                # Change in normal per radian of elevator, panels behind the hinge rotate about the spanwise axis
+                dn = np.zeros_like(n)
+                if hinge is not None:
+                    axis = span_dir / np.linalg.norm(span_dir, axis=2, keepdims=True)
+                    flap = x_mid >= hinge
+                    dn[:, flap, :] = np.cross(axis[:, flap, :], n[:, flap, :])
+                d_normal.append(dn.reshape(-1, 3))
+
+                trefftz_a.append(te[:-1])
+                trefftz_b.append(te[1:])
+
+        self.bound_a = np.concatenate(bound_a)  # Inboard end of each bound vortex
+        self.bound_b = np.concatenate(bound_b)  # Outboard end of each bound vortex
+        self.control = np.concatenate(control)  # Control points
+        self.normal = np.concatenate(normal)  # Panel normals
+        self.d_normal = np.concatenate(d_normal)  # Derivative of the panel normals with elevator deflection
+        self.trefftz_a = np.concatenate(trefftz_a)  # Strip edges at the trailing edge, used for the Trefftz plane
+        self.trefftz_b = np.concatenate(trefftz_b)
+        self.n_panels = len(self.control)
+        self.has_elevator = bool(np.any(self.d_normal))
+
+    def _factor(self):
+        """ Builds and factors the influence matrix, and the Trefftz plane drag matrix """
+        a, b = self.bound_a, self.bound_b
+        far = 1000 * max(self.bref, 1) * np.array([1., 0., 0.])
+        mirror = np.array([1., -1., 1.])
+
+        # Right hand horseshoes run far -> a -> b -> far, their mirror images run far -> b' -> a' -> far
+        v = (_segment_velocity(self.control, a + far, a) +
+             _segment_velocity(self.control, a, b) +
+             _segment_velocity(self.control, b, b + far) +
+             _segment_velocity(self.control, b * mirror + far, b * mirror) +
+             _segment_velocity(self.control, b * mirror, a * mirror) +
+             _segment_velocity(self.control, a * mirror, a * mirror + far))
+        aic = np.einsum('ijk,ik->ij', v, self.normal)
+        from scipy.linalg import lu_factor, lu_solve
+        self._lu = lu_factor(aic)
+
+        # Unit solutions, the circulation at any angle of attack and elevator deflection is a combination of these
+        self._g_x = lu_solve(self._lu, -self.normal[:, 0])
+        self._g_z = lu_solve(self._lu, -self.normal[:, 2])
+        self._e_x = lu_solve(self._lu, -self.d_normal[:, 0])
+        self._e_z = lu_solve(self._lu, -self.d_normal[:, 2])
+
+        # Trefftz plane, trailing legs are 2D vortices in the y-z plane at the strip edges
+        ya, yb = self.trefftz_a[:, 1:], self.trefftz_b[:, 1:]
+        y_mid = .5 * (ya + yb)
+        ds = yb - ya
+        self._strip_width = np.linalg.norm(ds, axis=1)
+        strip_normal = np.column_stack([-ds[:, 1], ds[:, 0]]) / self._strip_width[:, None]
+        flip = np.array([-1., 1.])
+
+        def vortex(points, strength):
+            r = y_mid[:, None, :] - points[None, :, :]
+            r2 = np.maximum(np.sum(r ** 2, axis=2), 1e-12)
+            vel = strength / (2 * np.pi * r2)[:, :, None] * np.stack([-r[:, :, 1], r[:, :, 0]], axis=2)
+            return np.einsum('ijk,ik->ij', vel, strip_normal)
+
+        self._trefftz = vortex(yb, 1) - vortex(ya, 1) - vortex(yb * flip, 1) + vortex(ya * flip, 1)
+
+        self._lift_arm = (b - a)[:, 1]  # Lift per unit circulation
+        self._midpoint = .5 * (a + b)
+
+    def solve(self, aoa, elevator=0, mach=0, xref=0, zref=0):
+        """
+        Returns the lift, induced drag and pitching moment coefficients at a given angle of attack and elevator
+        deflection. Either may be an array to sweep through several cases at once.
+
+        :param aoa: angle of attack (deg)
+        :param elevator: elevator deflection, trailing edge down (deg)
+        :param float mach: mach number
+        :param float xref: x location of the moment reference point (ft)
+        :param float zref: z location of the moment reference point (ft)
+
+        :return: cl, cdi, cm
+        """
+        alpha, delta = np.broadcast_arrays(np.deg2rad(aoa), np.deg2rad(elevator))
+        gamma = self._circulation(alpha, delta)
+        beta = _prandtl_glauert(mach)
+        cl = self._cl(gamma) / beta
+        cm = self._cm(gamma, alpha, xref, zref) / beta
+        cdi = self._cdi(gamma) / beta ** 2
+        return cl, cdi, cm
+
+    def trim(self, cl=None, aoa=None, mach=0, xref=0, zref=0):
+        """
+        Finds the angle of attack and elevator deflection for a given lift coefficient with zero pitching moment, or the
+        elevator deflection for zero pitching moment at a given angle of attack
+
+        :param float cl: target lift coefficient
+        :param float aoa: fixed angle of attack (deg), used instead of the lift coefficient
+        :param float mach: mach number
+        :param float xref: x location of the moment reference point, typically the cg (ft)
+        :param float zref: z location of the moment reference point (ft)
+
+        :return: cl, cdi, angle of attack (deg), elevator deflection (deg)
+        """
+        beta = _prandtl_glauert(mach)
+
+        def residual(x):
+            gamma = self._circulation(x[0], x[1])
+            return np.array([self._cl(gamma) - cl * beta, self._cm(gamma, x[0], xref, zref)])
+
+        if aoa is not None:
+            alpha = np.deg2rad(aoa)
+            delta = 0.
+            if self.has_elevator:
+                # Pitching moment is linear in the elevator deflection at a fixed angle of attack
+                cm_0 = self._cm(self._circulation(alpha, 0.), alpha, xref, zref)
+                cm_1 = self._cm(self._circulation(alpha, 1.), alpha, xref, zref) - cm_0
+                delta = -cm_0 / cm_1
+        else:
+            x = np.zeros(2)
+            n = 2 if self.has_elevator else 1
+            for i in range(20):
+                f = residual(x)
+                if np.all(np.abs(f[:n]) < 1e-10):
+                    break
+                # Finite difference jacobian, each evaluation is only a few dot products
+                jac = np.empty((2, 2))
+                for j in range(2):
+                    dx = np.zeros(2)
+                    dx[j] = 1e-6
+                    jac[:, j] = (residual(x + dx) - f) / 1e-6
+                x[:n] -= np.linalg.solve(jac[:n, :n], f[:n])
+            else:
+                logger.warning('Vortex lattice failed to achieve trim conditions')
+            alpha, delta = x
+
+        gamma = self._circulation(alpha, delta)
+        return (float(self._cl(gamma) / beta), float(self._cdi(gamma) / beta ** 2),
+                float(np.rad2deg(alpha)), float(np.rad2deg(delta)))
+
+    def _circulation(self, alpha, delta):
+        alpha = np.asarray(alpha)[..., None]
+        delta = np.asarray(delta)[..., None]
+        ca, sa = np.cos(alpha), np.sin(alpha)
+        return ca * self._g_x + sa * self._g_z + delta * (ca * self._e_x + sa * self._e_z)
+
+    def _cl(self, gamma):
+        # Kutta-Joukowski, both halves at unit velocity and density
+        return 4 * np.sum(gamma * self._lift_arm, axis=-1) / self.sref
+
+    def _cm(self, gamma, alpha, xref, zref):
+        alpha = np.asarray(alpha)[..., None]
+        lift = gamma * self._lift_arm
+        fx = -np.sin(alpha) * lift
+        fz = np.cos(alpha) * lift
+        my = (self._midpoint[:, 2] - zref) * fx - (self._midpoint[:, 0] - xref) * fz
+        return 4 * np.sum(my, axis=-1) / (self.sref * self.cref)
+
+    def _cdi(self, gamma):
+        strip_gamma = gamma.reshape(gamma.shape[:-1] + (-1, self.n_chordwise)).sum(axis=-1)
+        w = strip_gamma @ self._trefftz.T
+        return -2 * np.sum(strip_gamma * w * self._strip_width, axis=-1) / self.sref
+
+
+def vlm_coefficients(ac, fc, w, mach=None, cd0=None, cdw=None, aoa=None):
+    """
+    Vortex lattice replacement for avl_run.get_coefficients, trims the aircraft to level flight at weight w
+
+    :return: lift coefficient, drag coefficient, and angle of attack (deg)
+    """
+    if cd0 is None:
+        cd0 = ac.cd0
+    if cdw is None:
+        cdw = ac.cdw
+
+    vlm = ac.vortex_lattice
+    cl_target = w / (fc.q * ac.sref) if aoa is None else None
+    cl, cdi, alpha, elevator = vlm.trim(cl=cl_target, aoa=aoa, mach=fc.mach, xref=ac.cg[0], zref=ac.cg[2])
+    return cl, cd0 + cdw + cdi, alpha
+
+
+def alpha_sweep(ac, aoa, mach=None, elevator=0, cd0=None, cdw=None):
+    """
+    Lift, drag and pitching moment coefficients of the aircraft over a range of angles of attack
+
+    Every case reuses the aircraft's factored vortex lattice, so a sweep costs about the same as a single trim.
+
+    :param ac: aircraft to analyze
+    :param aoa: angles of attack (deg)
+    :param float mach: mach number, defaults to the cruise mach number
+    :param elevator: elevator deflection (deg)
+    :param float cd0: parasite drag coefficient, defaults to the aircraft's
+    :param float cdw: wave drag coefficient, defaults to the aircraft's
+
+    :return: arrays of cl, cd, and cm about the aircraft's cg
+    """
+    if mach is None:
+        mach = ac.mach_cruise
+    if cd0 is None:
+        cd0 = ac.cd0
+    if cdw is None:
+        cdw = ac.cdw
+    cl, cdi, cm = ac.vortex_lattice.solve(aoa, elevator=elevator, mach=mach, xref=ac.cg[0], zref=ac.cg[2])
+    return cl, cd0 + cdw + cdi, cm
+
+
+def _prandtl_glauert(mach):
+    return np.sqrt(1 - np.minimum(np.asarray(mach, dtype=float), .95) ** 2)
+
+
+def _segment_velocity(points, p1, p2, core=1e-10):
+    """
+    Velocity induced at each point by unit strength vortex segments running from p1 to p2 (Biot-Savart)
+
+    :return: array of shape (n_points, n_segments, 3)
+    """
+    r1 = points[:, None, :] - p1[None, :, :]
+    r2 = points[:, None, :] - p2[None, :, :]
+    cross = np.cross(r1, r2)
+    cross2 = np.sum(cross ** 2, axis=2)
+    r1_norm = np.linalg.norm(r1, axis=2)
+    r2_norm = np.linalg.norm(r2, axis=2)
+    r0 = p2 - p1
+    k = np.einsum('jk,ijk->ij', r0, r1 / np.maximum(r1_norm, core)[:, :, None] -
+                  r2 / np.maximum(r2_norm, core)[:, :, None])
+    k = np.where(cross2 > core, k / (4 * np.pi * np.maximum(cross2, core)), 0)
+    return cross * k[:, :, None]
@@ -0,0 +1,106 @@
+"""
+Solvers for the takeoff gross weight fixed point, see Aircraft.set_weight
+
+The component weights are estimated from a guess of the takeoff gross weight, and the weight they add up to is the new
+guess. Each solver is called as solver(evaluate, x, tolerance, max_iter), where evaluate(x) sets every component weight
+from the guess x and returns the resulting takeoff gross weight. A guess is converged when it's within tolerance of the
+weight it evaluates to, as a fraction of that weight. Solvers return their final guess, which should be the last one
+evaluated where possible so the component weights don't need to be evaluated again.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _converged(x, w, tolerance):
+    return abs((x - w) / w) < tolerance
+
+
+def relaxation(evaluate, x, tolerance=1e-5, max_iter=100, factor=.75):
+    """ Under-relaxed fixed point iteration, moves the guess a fraction of the way to the weight it evaluates to """
+    for i in range(max_iter):
+        w = evaluate(x)
+        if _converged(x, w, tolerance) or i == max_iter - 1:
+            return x
+        x = x + (w - x) * factor
+
+
+def aitken(evaluate, x, tolerance=1e-5, max_iter=100):
+    """
+    Aitken's delta squared acceleration (Steffensen's method), extrapolates every two fixed point iterations to the
+    limit they're converging to
+    """
+    n = 0
+    while n < max_iter:
+        w = evaluate(x)
+        n += 1
+        if _converged(x, w, tolerance) or n == max_iter:
+            return x
+        w2 = evaluate(w)
+        n += 1
+        if _converged(w, w2, tolerance) or n == max_iter:
+            return w
+        denominator = w2 - 2 * w + x
+        x = w2 if denominator == 0 else x - (w - x) ** 2 / denominator
+    return x
+
+
+def secant(evaluate, x, tolerance=1e-5, max_iter=100):
+    """
+    Secant method on the residual between the guess and the weight it evaluates to, the scalar form of Anderson
+    acceleration. The first step is a plain fixed point iteration.
+    """
+    x_prev = r_prev = None
+    for i in range(max_iter):
+        w = evaluate(x)
+        if _converged(x, w, tolerance) or i == max_iter - 1:
+            return x
+        r = w - x
+        if r_prev is None or r == r_prev:
+            x_next = w
+        else:
+            x_next = x - r * (x - x_prev) / (r - r_prev)
+        x_prev, r_prev, x = x, r, x_next
+
+
+def brent(evaluate, x, tolerance=1e-5, max_iter=100):
+    """
+    Brent's method on the residual between the guess and the weight it evaluates to, after bracketing the root by
+    stepping along the residual with a doubling step
+    """
+    from scipy.optimize import brentq
+
+    def residual(guess):
+        return evaluate(guess) - guess
+
+    a = x
+    ra = residual(a)
+    if _converged(a, a + ra, tolerance):
+        return a
+
+    step = ra
+    b = a + step
+    rb = residual(b)
+    n = 2
+    while ra * rb > 0:
+        if n >= max_iter:
+            logger.warning('Could not bracket the takeoff gross weight')
+            return b
+        a, ra = b, rb
+        step *= 2
+        b = a + step
+        rb = residual(b)
+        n += 1
+    if rb == 0:
+        return b
+
+    return brentq(residual, min(a, b), max(a, b), rtol=tolerance, maxiter=max(max_iter - n, 1), disp=False)
+
+
+# Takeoff gross weight solvers by name, see Aircraft.weight_solver
+WEIGHT_SOLVERS = {
+    'relaxation': relaxation,
+    'aitken': aitken,
+    'secant': secant,
+    'brent': brent
+}
@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from WUADS import Aircraft
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), '..', 'src', 'WUADS', 'assets', '737-800.yml')
+
+
+@pytest.fixture
+def aircraft(tmp_path, monkeypatch):
+    """ 737-800 analyzed with the vortex lattice backend, so the tests don't need AVL """
+    monkeypatch.chdir(tmp_path)
+    ac = Aircraft(CONFIG_FILE)
+    ac.aero_backend = 'vlm'
+    return ac
@@ -0,0 +1,101 @@
+import copy
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from WUADS import Aircraft
+
+from conftest import CONFIG_FILE
+
+
+def _results(ac):
+    return ac.weight_takeoff, ac.weight_empty, ac.cd0, ac.cdw, ac.mission.range
+
+
+def _analyze(ac):
+    ac.mission.run_case(mute_output=True)
+    return type(ac.aero_components['Main Wing']).__name__, _results(ac)
+
+
+def test_snapshot_restore_round_trip(aircraft):
+    aircraft.mission.run_case(mute_output=True)
+    before = _results(aircraft)
+    snapshot = aircraft.snapshot()
+
+    aircraft.update_component(('Main Wing', 'span', 125))
+    aircraft.mission.run_case(mute_output=True)
+    assert _results(aircraft) != before
+
+    aircraft.restore(snapshot)
+    assert _results(aircraft) == before
+    assert aircraft.mission.aircraft is aircraft
+
+    # The same snapshot can be restored again after more edits
+    aircraft.update_component(('Fuselage', 'length', 120))
+    aircraft.restore(snapshot)
+    assert _results(aircraft) == before
+
+
+def test_deepcopy_is_an_independent_clone(aircraft):
+    aircraft.mission.run_case(mute_output=True)
+    before = _results(aircraft)
+    copied = copy.deepcopy(aircraft)
+    cloned = aircraft.clone()
+
+    # Both share the caches, and their own objects point back at the copy
+    for ac in (copied, cloned):
+        assert ac.drag_cache is aircraft.drag_cache
+        assert ac.avl_cache is aircraft.avl_cache
+        assert ac.mission.aircraft is ac
+        assert ac.aero_components['Main Wing'] is not aircraft.aero_components['Main Wing']
+    assert _results(copied) == _results(cloned) == before
+
+    copied.update_component(('Main Wing', 'span', 125))
+    cloned.update_component(('Main Wing', 'span', 125))
+    assert _results(aircraft) == before
+    assert copied.weight_takeoff == cloned.weight_takeoff != aircraft.weight_takeoff
+    assert copied.geometry_version != aircraft.geometry_version
+
+
+def test_pickle_leaves_out_caches(aircraft):
+    aircraft.mission.run_case(mute_output=True)
+    aircraft.vortex_lattice
+    unpickled = pickle.loads(pickle.dumps(aircraft))
+
+    assert unpickled.mission.aircraft is unpickled
+    assert unpickled.drag_cache.stats()['size'] == 0
+    assert unpickled._vortex_lattice is None
+    assert _results(unpickled) == _results(aircraft)
+    assert len(pickle.dumps(aircraft)) < 100000
+
+
+def test_spawn_process_pool(tmp_path, monkeypatch):
+    # Custom wing loaded from a file, which a spawned worker has never imported
+    module_file = tmp_path / 'custom_wing.py'
+    module_file.write_text('from WUADS.components.aerobodies.wing import Wing\n\n\nclass CustomWing(Wing):\n    pass\n')
+    with open(CONFIG_FILE) as f:
+        config = yaml.safe_load(f)
+    wing = config['components'].pop('wing')
+    wing.update({'module_name': str(module_file), 'title': 'Main Wing'})
+    config['components'] = {'CustomWing': wing, **config['components']}
+    config_file = tmp_path / 'custom.yml'
+    config_file.write_text(yaml.safe_dump(config, sort_keys=False))
+
+    monkeypatch.chdir(tmp_path)
+    ac = Aircraft(str(config_file))
+    ac.aero_backend = 'vlm'
+    variants = []
+    for span in (110, 120):
+        variant = ac.clone()
+        variant.update_component(('Main Wing', 'span', span))
+        variants.append(variant)
+
+    serial = [_analyze(variant.clone()) for variant in variants]
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        parallel = list(executor.map(_analyze, variants))
+
+    assert parallel == serial
+    assert parallel[0][0] == 'CustomWing'
+    assert not (tmp_path / 'output').exists()
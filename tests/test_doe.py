@@ -0,0 +1,97 @@
+import math
+
+import pytest
+
+from WUADS import ResultStore
+from WUADS.doe import run_doe
+
+from conftest import CONFIG_FILE
+
+VARIABLES = [('Main Wing', 'area', 1200, 1500), ('Main Wing', 'sweep', 20, 30)]
+N_SAMPLES = 6
+
+
+class Stop(Exception):
+    pass
+
+
+def _run(output_file, variables=VARIABLES, seed=1, progress=None):
+    # Threads and no mission keep it quick, resuming doesn't depend on either
+    return run_doe(CONFIG_FILE, variables, N_SAMPLES, seed=seed, output_file=output_file, run_mission=False,
+                   aero_backend='vlm', max_workers=1, use_processes=False, progress=progress)
+
+
+def _same(records, expected):
+    assert len(records) == len(expected)
+    for record, other in zip(records, expected):
+        assert record.keys() == other.keys()
+        for name, value in record.items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(other[name])
+            else:
+                assert value == pytest.approx(other[name], rel=1e-9)
+
+
+def _stop_after(n):
+    def progress(n_completed, n_samples):
+        if n_completed == n:
+            raise Stop
+    return progress
+
+
+@pytest.fixture
+def expected(tmp_path, monkeypatch):
+    """ Records of the design run from start to finish """
+    monkeypatch.chdir(tmp_path)
+    records = _run(str(tmp_path / 'full.csv'))
+    assert [record['sample'] for record in records] == list(range(N_SAMPLES))
+    assert not any(record['error'] for record in records)
+    return records
+
+
+def test_resume_csv_with_truncated_row(tmp_path, expected):
+    csv_file = tmp_path / 'doe.csv'
+    lines = (tmp_path / 'full.csv').read_text().splitlines(True)
+    # Header, three complete rows and half of the fourth, as a crash would leave it
+    csv_file.write_text(''.join(lines[:4]) + lines[4][:len(lines[4]) // 2])
+
+    calls = []
+    records = _run(str(csv_file), progress=lambda n, total: calls.append(n))
+    assert calls == [4, 5, 6]  # Only the missing samples are run
+    _same(records, expected)
+
+    lines = csv_file.read_text().splitlines()
+    assert len(lines) == N_SAMPLES + 1
+    assert sorted(int(line.split(',')[0]) for line in lines[1:]) == list(range(N_SAMPLES))
+
+
+def test_resume_store(tmp_path, expected):
+    db_file = str(tmp_path / 'doe.sqlite')
+    with pytest.raises(Stop):
+        _run(ResultStore(db_file), progress=_stop_after(2))
+    with ResultStore(db_file) as store:
+        assert next(store.query('SELECT COUNT(*) n FROM runs'))['n'] == 2
+
+    calls = []
+    records = _run(ResultStore(db_file), progress=lambda n, total: calls.append(n))
+    assert calls == [3, 4, 5, 6]
+    _same(records, expected)
+    with ResultStore(db_file) as store:
+        assert next(store.query('SELECT COUNT(*) n, COUNT(DISTINCT sample) d FROM runs')) == \
+            {'n': N_SAMPLES, 'd': N_SAMPLES}
+
+
+def test_different_design(tmp_path, expected):
+    csv_file = str(tmp_path / 'full.csv')
+    with pytest.raises(ValueError, match='different design'):
+        _run(csv_file, seed=2)
+    with pytest.raises(ValueError, match='has columns'):
+        _run(csv_file, variables=VARIABLES[:1])
+
+    db_file = str(tmp_path / 'doe.sqlite')
+    with pytest.raises(Stop):
+        _run(ResultStore(db_file), progress=_stop_after(2))
+    with pytest.raises(ValueError, match='different design'):
+        _run(ResultStore(db_file), seed=2)
+    with pytest.raises(ValueError, match='has inputs'):
+        _run(ResultStore(db_file), variables=VARIABLES[:1])
@@ -0,0 +1,25 @@
+import copy
+import pickle
+
+import pytest
+
+from WUADS.propulsion import turbofan
+
+
+def test_engine_deck_is_replaced_whole():
+    engine = turbofan(35000, .78)
+    sfc, thrust = engine.analyze_performance(30000, .7)
+    table = engine._table
+
+    # Reading the deck leaves the interpolation table alone, and it can't be edited in place
+    engine.thrust_input, engine.sfc_input, engine.altitude_ref, engine.mach_ref
+    assert engine._table is table
+    with pytest.raises(ValueError):
+        engine.thrust_input[0, 0] = 1
+
+    engine.thrust_input = engine.thrust_input * 1.1
+    assert engine.analyze_performance(30000, .7) == pytest.approx((sfc, thrust * 1.1))
+
+    for copied in (copy.deepcopy(engine), pickle.loads(pickle.dumps(engine))):
+        assert not copied.thrust_input.flags.writeable
+        assert copied.analyze_performance(30000, .7) == pytest.approx((sfc, thrust * 1.1))
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from WUADS import ResultStore
+
+
+def _record(span):
+    return {'run': {'title': 'test', 'weight_takeoff': 1000. * span, 'range': 10. * span},
+            'inputs': {'span': span},
+            'components': [{'name': 'Main Wing', 'category': 'aero', 'weight': 100. * span, 'cd0': .01}],
+            'segments': [{'position': 0, 'title': 'cruise', 'segment_type': 'cruise', 'range': 10. * span}]}
+
+
+def _count(db_file, table='runs'):
+    """ Rows written to the file, as seen by another connection """
+    with sqlite3.connect(db_file) as db:
+        return db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_append_flush_read_back(tmp_path):
+    db_file = str(tmp_path / 'results.sqlite')
+    store = ResultStore(db_file, buffer_size=3)
+    assert [store.append(_record(span)) for span in (100, 110)] == [1, 2]
+    assert _count(db_file) == 0  # Still buffered
+
+    store.append(_record(120))
+    assert _count(db_file) == 3  # The full buffer is written
+    store.append(_record(130))
+    assert _count(db_file) == 3
+    store.flush()
+    assert _count(db_file) == 4
+    assert _count(db_file, 'segments') == 4
+    store.append(_record(140))
+    store.close()
+    assert _count(db_file) == 5
+
+    # Runs are numbered on from the ones already in the file
+    with ResultStore(db_file) as store:
+        assert store.append(_record(150)) == 6
+        rows = list(store.query('SELECT r.run, i.value span, r.weight_takeoff, c.weight, s.range FROM runs r '
+                                'JOIN inputs i USING (run) JOIN components c USING (run) JOIN segments s USING (run) '
+                                'ORDER BY r.run'))
+    assert [row['run'] for row in rows] == [1, 2, 3, 4, 5, 6]
+    for row, span in zip(rows, (100, 110, 120, 130, 140, 150)):
+        assert row == {'run': row['run'], 'span': span, 'weight_takeoff': 1000 * span, 'weight': 100 * span,
+                       'range': 10 * span}
+
+
+def test_add_aircraft(aircraft, tmp_path):
+    aircraft.mission.run_case(mute_output=True)
+    with ResultStore(str(tmp_path / 'results.sqlite')) as store:
+        store.add(aircraft, inputs={'span': aircraft.aero_components['Main Wing'].span})
+        run = next(store.query('SELECT * FROM runs'))
+        components = {row['name']: row for row in store.query('SELECT * FROM components')}
+        segments = list(store.query('SELECT * FROM segments ORDER BY position'))
+
+    assert run['weight_takeoff'] == aircraft.weight_takeoff
+    assert run['range'] == aircraft.mission.range
+    assert run['error'] is None
+    assert components['Main Wing']['weight'] == aircraft.aero_components['Main Wing'].weight
+    assert sum(row['cd0'] for row in components.values() if row['category'] == 'aero') == \
+        pytest.approx(aircraft.cd0)
+    assert [row['title'] for row in segments] == [seg.title for seg in aircraft.mission.mission_profile]
@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from WUADS.components.aerobodies.wing import Wing
+from WUADS.components.component import PhysicalComponent
+from WUADS.flight_conditions import FlightConditions, FlightConditionsArray
+
+CONDITIONS = [(h, m) for h in (0, 20000, 35000) for m in (.3, .6, .78, .85)]
+
+
+def _thickness(wing):
+    tc_list = list(wing.airfoil_thickness) or [wing.tc]
+    while len(tc_list) < len(wing.avl_sections):
+        tc_list.append(tc_list[-1])
+    return tc_list
+
+
+def loop_parasite_drag(wing, flight_conditions, sref):
+    """ Wing.parasite_drag as it was before it was vectorized, evaluating one strip at a time """
+    cd0 = 0
+    tc_list = _thickness(wing)
+    for i in range(len(wing.avl_sections) - 1):
+        span = wing.avl_sections[i + 1][1] - wing.avl_sections[i][1]
+        if span == 0:
+            span = wing.avl_sections[i + 1][2] - wing.avl_sections[i][2]
+
+        n_strips_section = round(40 * (span / wing.span))
+        dy = span / n_strips_section
+        chords = np.linspace(wing.avl_sections[i][3], wing.avl_sections[i + 1][3], n_strips_section + 1)
+        sweep = np.arctan((wing.avl_sections[i + 1][0] - wing.avl_sections[i][0]) / span)
+        tc = np.linspace(tc_list[i], tc_list[i + 1], n_strips_section)
+
+        for j in range(n_strips_section):
+            form_factor = ((1 + tc[j] * .6 / wing.xc + 100 * tc[j] ** 4) *
+                           (1.34 * flight_conditions.mach ** .18 * (np.cos(sweep)) ** .28))
+            l_char = .5 * (chords[j] + chords[j + 1])
+            area = l_char * dy * 2
+            aspect_ratio = dy ** 2 / area
+            kq = 0.95
+            t = chords[j + 1] / chords[j]
+            l_char = chords[j] * (2 / 3) * ((1 + t + t ** 2) / (1 + t))
+
+            Qw = kq * tc[j] * area * np.sqrt(area / aspect_ratio) / np.sqrt(1 + t)
+            s_wet = (2 + .5 * tc[j]) * (Qw * np.sqrt(aspect_ratio * (1 + t)) / (kq * tc[j])) ** (2 / 3)
+            cd0 += PhysicalComponent.parasite_drag(wing, form_factor, l_char, flight_conditions, sref) * \
+                s_wet / wing.s_wet
+    return cd0
+
+
+@pytest.mark.parametrize('conditions', [FlightConditions, FlightConditionsArray])
+def test_parasite_drag_matches_strip_loop(aircraft, conditions):
+    wings = [comp for comp in aircraft.aero_components.values() if isinstance(comp, Wing)]
+    assert wings
+    for wing in wings:
+        for height, mach in CONDITIONS:
+            reference = loop_parasite_drag(wing, FlightConditions(height, mach), aircraft.sref)
+            wing.parasite_drag(conditions(height, mach), aircraft.sref, aircraft)
+            assert wing.cd0 == pytest.approx(reference, rel=1e-12)
+
+
+def loop_wave_drag(wing, aircraft, flight_conditions):
+    """ Wing.set_wave_drag as it was before it was vectorized, evaluating one strip at a time """
+    fc = flight_conditions
+    rho = fc.rho
+    v = fc.velocity
+    m = fc.mach
+    if m < .5 or aircraft.sref == 0:
+        return 0
+
+    gamma_0 = aircraft.weight_takeoff * .99 / (.25 * np.pi * v * rho * wing.span)
+    cdw = 0
+    tc_list = _thickness(wing)
+    for i in range(len(wing.avl_sections) - 1):
+        span = (wing.avl_sections[i + 1][1] - wing.avl_sections[i][1])
+        if span == 0:
+            span = wing.avl_sections[i + 1][2] - wing.avl_sections[i][2]
+
+        n_strips_section = round(40 * (span / (.5 * wing.span)))
+        dy = span / n_strips_section
+        chords = np.linspace(wing.avl_sections[i][3], wing.avl_sections[i + 1][3], n_strips_section + 1)
+        tc = np.linspace(tc_list[i], tc_list[i + 1], n_strips_section)
+        yle = wing.avl_sections[i][1]
+        y_dist = np.linspace(yle, yle + span, n_strips_section)
+
+        for j in range(n_strips_section):
+            c = .5 * (chords[j] + chords[j + 1])
+            area = c * dy
+            with np.errstate(invalid='ignore'):
+                gamma = gamma_0 * np.sqrt(1 - (2 * (y_dist[j] - wing.yle) / wing.span) ** 2)
+            lprime = rho * v * gamma
+            cl = lprime / (.5 * rho * v ** 2 * c)
+            cos = np.cos(wing.sweep_mid)
+            mdd = (.95 - cl / (10 * cos ** 2) - tc[j] / cos) / cos
+            mcr = mdd - .1077217
+            if m > mcr:
+                cdw += 20 * (m - mcr) ** 4 * (area / aircraft.sref) * 2
+    return cdw
+
+
+# Spans Mach numbers below .5, above .5 with every strip still below its critical Mach, and the drag rise
+MACHS = np.linspace(.3, .9, 31)
+
+
+def test_wave_drag_matches_strip_loop(aircraft):
+    wing = aircraft.aero_components['Main Wing']
+    assert type(wing).set_wave_drag is Wing.set_wave_drag
+    for height in (20000, aircraft.h_cruise):
+        cdw = wing.set_wave_drag(aircraft, flight_conditions=FlightConditionsArray(height, MACHS))
+        reference = [loop_wave_drag(wing, aircraft, FlightConditions(height, mach)) for mach in MACHS]
+        assert cdw == pytest.approx(reference, rel=1e-12, abs=1e-15)
+
+        # Scalar conditions give the same, and set the wave drag from Mach .5 up
+        for mach, expected in zip(MACHS, reference):
+            assert wing.set_wave_drag(aircraft, flight_conditions=FlightConditions(height, mach)) == \
+                pytest.approx(expected, rel=1e-12, abs=1e-15)
+            if mach >= .5:
+                assert wing.cdw == pytest.approx(expected, rel=1e-12, abs=1e-15)
+
+
+def test_drag_rise_matches_point_calls(aircraft):
+    cdw = aircraft.drag_rise(MACHS)
+    assert cdw.shape == MACHS.shape
+
+    reference = []
+    for mach in MACHS:
+        fc = FlightConditions(aircraft.h_cruise, mach)
+        reference.append(sum(comp.set_wave_drag(aircraft, flight_conditions=fc)
+                             for comp in aircraft.aero_components.values()))
+    assert cdw == pytest.approx(reference, rel=1e-12, abs=1e-15)
+
+    subsonic = MACHS < .5
+    assert np.all(cdw[subsonic] == 0)
+    assert np.any(cdw[~subsonic] == 0)  # Above Mach .5 but below the critical Mach of every strip
+    assert np.all(np.diff(cdw[cdw > 0]) > 0)
+
+
+def test_drag_rise_broadcasts_heights(aircraft):
+    heights = np.array([25000, 30000, 35000])
+    cdw = aircraft.drag_rise(MACHS, height=heights[:, None])
+    assert cdw.shape == (len(heights), len(MACHS))
+    for row, height in zip(cdw, heights):
+        assert row == pytest.approx(aircraft.drag_rise(MACHS, height=height), rel=1e-12, abs=1e-15)
+
+    weight = .8 * aircraft.weight_takeoff
+    lighter = aircraft.drag_rise(MACHS, weight=weight)
+    heavier = aircraft.drag_rise(MACHS)
+    assert np.all(lighter <= heavier)
+    assert np.any(lighter < heavier)